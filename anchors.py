@@ -0,0 +1,135 @@
+import cv2
+import numpy as np
+import threading
+from collections import namedtuple
+from log_setup import subsystem
+from metrics import count, timer
+from pyramid_match import pyramid_match
+from screen_source import get_screen_source
+from template_bank import get_template_bank
+
+log = subsystem("recognition")
+
+# Same shape as pyautogui's Box so results can be passed straight to click/moveTo
+Box = namedtuple('Box', 'left top width height')
+
+# Pixels searched around a cached anchor before falling back to a full-screen search
+anchor_margin = 8
+
+# Best TM_CCOEFF_NORMED match of a template in an image as (score, (x, y)), matching locateOnScreen's confidence
+def best_match(image, template):
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return -1.0, None
+    if image.shape[:2] == template.shape[:2]:
+        return score_at(image, template), (0, 0)
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+# TM_CCOEFF_NORMED of a template against an image of the same size. matchTemplate switches to a DFT
+# for large templates, which is an order of magnitude slower than this for a single position.
+def score_at(image, template):
+    channels = template.shape[2] if template.ndim == 3 else 1
+    a = image.astype(np.float32)
+    b = template.astype(np.float32)
+    a -= np.float32(cv2.mean(image)[:channels])
+    b -= np.float32(cv2.mean(template)[:channels])
+    denominator = np.sqrt(float(np.vdot(a, a)) * float(np.vdot(b, b)))
+    return float(np.vdot(a, b)) / denominator if denominator > 0 else 0.0
+
+# Remembers where each anchor was last seen and re-checks that spot first
+class AnchorCache:
+    def __init__(self, source=None, confidence=0.8, margin=anchor_margin, pyramid=True):
+        self.source = source
+        self.confidence = confidence
+        self.margin = margin
+        self.pyramid = pyramid
+        self.boxes = {}
+        self.hits = {}
+        self.misses = {}
+        self.unknown = set()
+        self._lock = threading.Lock()
+
+    def _source(self):
+        return self.source if self.source is not None else get_screen_source()
+
+    # Region of margin pixels around a cached box, clipped to the screen
+    def _roi(self, box, screen_size, margin):
+        x0 = max(box.left - margin, 0)
+        y0 = max(box.top - margin, 0)
+        x1 = min(box.left + box.width + margin, screen_size[0])
+        y1 = min(box.top + box.height + margin, screen_size[1])
+        return x0, y0, x1 - x0, y1 - y0
+
+    # Find an anchor on screen; template defaults to the button template of that name
+    def locate(self, name, template=None, confidence=None):
+        confidence = self.confidence if confidence is None else confidence
+        if template is None:
+            template = get_template_bank().buttons_color.get(name)
+            if template is None:
+                # Anchors are polled every frame: report a missing template once per name
+                if name not in self.unknown:
+                    self.unknown.add(name)
+                    log.error("No template loaded for anchor %s", name)
+                count('anchor_no_template')
+                return None
+        source = self._source()
+        height, width = template.shape[:2]
+
+        cached = self.boxes.get(name)
+        if cached is not None:
+            # Usually nothing moved: score the exact cached spot first (one position), then the margin around it
+            for margin in (0, self.margin):
+                roi = self._roi(cached, source.size(), margin)
+                with timer('anchor_recheck'):
+                    score, loc = best_match(source.grab(roi), template)
+                if loc is not None and score >= confidence:
+                    count('anchor_hit')
+                    box = Box(roi[0] + loc[0], roi[1] + loc[1], width, height)
+                    with self._lock:
+                        self.boxes[name] = box
+                        self.hits[name] = self.hits.get(name, 0) + 1
+                    return box
+
+        with self._lock:
+            self.misses[name] = self.misses.get(name, 0) + 1
+        count('anchor_miss')
+        with timer('anchor_search'):
+            if self.pyramid:
+                score, loc = pyramid_match(source.grab(), template, min_score=confidence)
+            else:
+                score, loc = best_match(source.grab(), template)
+        if loc is None or score < confidence:
+            log.debug("Anchor %s not found (best score %.3f)", name, score)
+            self.invalidate(name)
+            return None
+        box = Box(loc[0], loc[1], width, height)
+        with self._lock:
+            self.boxes[name] = box
+        return box
+
+    # Forget a cached position (or all of them)
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self.boxes.clear()
+            else:
+                self.boxes.pop(name, None)
+
+    # Hit/miss counters per anchor
+    def stats(self):
+        with self._lock:
+            names = set(self.hits) | set(self.misses)
+            return {name: {"hits": self.hits.get(name, 0), "misses": self.misses.get(name, 0)} for name in sorted(names)}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Shared anchor cache
+def get_anchor_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnchorCache()
+    return _cache
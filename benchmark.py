@@ -0,0 +1,145 @@
+import cv2
+import numpy as np
+import time
+import sys
+import tracemalloc
+from anchors import best_match
+from frame_pool import FramePool
+from inventory_scan import find_peaks, match_threshold, min_distance
+from pyramid_match import pyramid_match
+from template_bank import get_template_bank
+
+try:
+    import pyscreeze
+except ImportError:
+    pyscreeze = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Saved inventory frame used for the recognition micro-benchmarks
+inventory_frame_path = r"images/Inventory_with_eggs.png"
+
+# Recorded full-screen frame with the trade window open
+screen_frame_path = r"images/fewfewfew.PNG"
+
+# Time a callable, returning (best seconds per call, last result)
+def time_call(func, repeat=5, number=1):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            result = func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best, result
+
+# Pairwise filtering loop that find_peaks replaced, kept as the baseline
+def legacy_filter_points(result, threshold=match_threshold, min_distance=min_distance):
+    loc = np.where(result >= threshold)
+    filtered_points = []
+    for point in zip(*loc[::-1]):
+        if all(np.linalg.norm(np.array(point) - np.array(fp)) >= min_distance for fp in filtered_points):
+            filtered_points.append(point)
+    return filtered_points
+
+# Compare the legacy point filter with find_peaks on a saved inventory frame
+def bench_item_peaks(item="dino_egg", frame_path=inventory_frame_path, threshold=match_threshold):
+    frame = cv2.imread(frame_path, cv2.IMREAD_GRAYSCALE)
+    if frame is None:
+        print(f"Failed to load {frame_path}")
+        return None
+    template = get_template_bank().items_inventory[item]
+    result = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+    candidates = int((result >= threshold).sum())
+
+    legacy_time, legacy_points = time_call(lambda: legacy_filter_points(result, threshold), repeat=3)
+    peaks_time, peaks = time_call(lambda: find_peaks(result, threshold), number=20)
+
+    print(f"{item} on {frame_path}: {candidates} candidate pixels above {threshold}")
+    print(f"  legacy filter: {len(legacy_points)} points in {legacy_time * 1000:.2f} ms")
+    print(f"  find_peaks:    {len(peaks)} points in {peaks_time * 1000:.2f} ms")
+    return {"candidates": candidates, "legacy": legacy_time, "peaks": peaks_time,
+            "legacy_points": legacy_points, "peak_points": peaks}
+
+# Compare a full-resolution search (what locateOnScreen does) with the pyramid matcher on a recorded frame
+def bench_anchor_search(frame_path=screen_frame_path, confidence=0.8):
+    frame = cv2.imread(frame_path, cv2.IMREAD_COLOR)
+    if frame is None:
+        print(f"Failed to load {frame_path}")
+        return None
+    results = {}
+    for name, template in get_template_bank().buttons_color.items():
+        full_time, (full_score, full_loc) = time_call(lambda: best_match(frame, template), repeat=2)
+        pyramid_time, (pyramid_score, pyramid_loc) = time_call(lambda: pyramid_match(frame, template), repeat=3)
+        agree = (full_score >= confidence) == (pyramid_score >= confidence) and \
+            (full_score < confidence or full_loc == pyramid_loc)
+        print(f"{name}: full {full_time * 1000:.0f} ms {full_loc} {full_score:.3f} | "
+              f"pyramid {pyramid_time * 1000:.0f} ms {pyramid_loc} {pyramid_score:.3f} | {'same' if agree else 'DIFFERENT'}")
+        if pyscreeze is not None:
+            locate_time, _ = time_call(lambda: pyscreeze.locate(template, frame, confidence=confidence), repeat=1)
+            print(f"  pyscreeze.locate: {locate_time * 1000:.0f} ms")
+        results[name] = {"full": full_time, "pyramid": pyramid_time, "agree": agree}
+    return results
+
+# Peak traced memory in MB while running func, and its result
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6, result
+
+# Compare a capture loop that allocates its BGR and grayscale frames every iteration with one that
+# converts into pooled buffers, on a BGRA copy of a recorded frame (what mss hands out)
+def bench_capture_buffers(frame_path=screen_frame_path, iterations=30):
+    frame = cv2.imread(frame_path, cv2.IMREAD_COLOR)
+    if frame is None:
+        print(f"Failed to load {frame_path}")
+        return None
+    raw = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+    slots = [(1640, 497, 21, 20), (1306, 498, 21, 20)]
+
+    def allocating():
+        for _ in range(iterations):
+            bgr = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR)
+            gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+            crops = [gray[y:y + h, x:x + w].copy() for x, y, w, h in slots]
+        return crops
+
+    pool = FramePool()
+
+    def pooled():
+        for _ in range(iterations):
+            bgr = pool.convert(raw, cv2.COLOR_BGRA2BGR, "capture")
+            gray = pool.gray(bgr)
+            crops = [gray[y:y + h, x:x + w] for x, y, w, h in slots]
+        return crops
+
+    results = {}
+    frame_mb = (raw.shape[0] * raw.shape[1] * 4) / 1e6
+    print(f"Capture loop on a {raw.shape[1]}x{raw.shape[0]} frame ({iterations} iterations):")
+    for name, loop in (("allocating", allocating), ("pooled", pooled)):
+        loop_time, _ = time_call(loop, repeat=3)
+        peak, _ = peak_memory(loop)
+        per_frame = loop_time / iterations
+        print(f"  {name:10s} {per_frame * 1000:6.2f} ms/frame  peak {peak:6.1f} MB")
+        results[name] = {"per_frame": per_frame, "peak_mb": peak}
+    stats = pool.stats()
+    print(f"  pool: {stats['allocations']} allocations, {stats['reuses']} reuses, "
+          f"{stats['allocated_mb']:.1f} MB allocated in total (raw frame {frame_mb:.1f} MB)")
+    results["pool"] = stats
+    return results
+
+if __name__ == "__main__":
+    threshold = float(sys.argv[1]) if len(sys.argv) > 1 else match_threshold
+    for item in get_template_bank().items_inventory:
+        bench_item_peaks(item, threshold=threshold)
+    bench_anchor_search()
+    bench_capture_buffers()
+    if resource is not None:
+        print(f"Peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
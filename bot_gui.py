@@ -0,0 +1,199 @@
+import logging
+import sys
+import threading
+import traceback
+import tkinter as tk
+from tkinter import ttk
+from PIL import Image, ImageTk
+import TradeBot as bot
+from metrics import get_metrics
+from price_service import get_price_service
+from strategy import StrategyEngine, prices_for_items
+from template_bank import item_templates
+from trade_journal import get_trade_journal
+
+# GUI Implementation
+class BotApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("TradeBot")
+        self.running = False
+        self.stop_event = threading.Event()
+
+        try:
+            self.bg_image = Image.open("Background.png")
+            self.bg_image = self.bg_image.resize((400, 400), Image.Resampling.LANCZOS)
+            self.bg_photo = ImageTk.PhotoImage(self.bg_image)
+        except Exception as e:
+            logging.error(f"Failed to load background image: {str(e)}")
+            print(f"Failed to load background image: {str(e)}")
+
+        self.notebook = ttk.Notebook(self.root)
+        self.notebook.pack(fill='both', expand=True)
+
+        self.main_frame = tk.Frame(self.notebook, width=400, height=400)
+        self.prices_frame = tk.Frame(self.notebook, width=400, height=400)
+        self.main_frame.pack(fill='both', expand=True)
+        self.prices_frame.pack(fill='both', expand=True)
+
+        self.metrics_frame = tk.Frame(self.notebook, width=400, height=400)
+        self.metrics_frame.pack(fill='both', expand=True)
+
+        self.notebook.add(self.main_frame, text='Main')
+        self.notebook.add(self.prices_frame, text='Prices')
+        self.notebook.add(self.metrics_frame, text='Metrics')
+
+        self.canvas = tk.Canvas(self.main_frame, width=400, height=400)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.create_image(0, 0, anchor="nw", image=self.bg_photo)
+
+        self.item_label = tk.Label(self.main_frame, text="Item to Trade:")
+        self.item_label.place(x=10, y=10)
+        self.item_var = tk.StringVar()
+        self.item_dropdown = ttk.Combobox(self.main_frame, textvariable=self.item_var)
+        self.item_dropdown['values'] = list(item_templates.keys())
+        self.item_dropdown.place(x=120, y=10)
+
+        self.item_count_label = tk.Label(self.main_frame, text="Count:")
+        self.item_count_label.place(x=10, y=40)
+        self.item_count_entry = tk.Entry(self.main_frame, width=10)
+        self.item_count_entry.place(x=120, y=40)
+        self.item_count_entry.insert(0, "Max. 99")
+        self.item_count_entry.bind("<FocusIn>", self.clear_placeholder)
+        self.item_count_entry.bind("<FocusOut>", self.set_placeholder)
+
+        self.want_item_label = tk.Label(self.main_frame, text="Desired Item:")
+        self.want_item_label.place(x=10, y=70)
+        self.want_item_var = tk.StringVar()
+        self.want_item_dropdown = ttk.Combobox(self.main_frame, textvariable=self.want_item_var)
+        self.want_item_dropdown['values'] = list(item_templates.keys())
+        self.want_item_dropdown.place(x=120, y=70)
+
+        self.want_item_count_label = tk.Label(self.main_frame, text="Count:")
+        self.want_item_count_label.place(x=10, y=100)
+        self.want_item_count_entry = tk.Entry(self.main_frame, width=10)
+        self.want_item_count_entry.place(x=120, y=100)
+        self.want_item_count_entry.insert(0, "Max. 99")
+        self.want_item_count_entry.bind("<FocusIn>", self.clear_placeholder)
+        self.want_item_count_entry.bind("<FocusOut>", self.set_placeholder)
+
+        self.start_button = tk.Button(self.main_frame, text="Start", command=self.toggle_bot)
+        self.start_button.place(x=10, y=130)
+
+        # Completed trades survive restarts through the trade journal
+        journal = get_trade_journal()
+        self.trades_completed = journal.state()["trades_completed"]
+        self.trade_count_label = tk.Label(self.main_frame, text=f"Trades Completed: {self.trades_completed}")
+        self.trade_count_label.place(x=10, y=160)
+        journal.subscribe(lambda record: self.root.after(0, self.on_journal_record, record))
+
+        self.strategy_label = tk.Label(self.main_frame, text="Strategy Suggestions (Fetch):")
+        self.strategy_label.place(x=220, y=10)
+        self.strategy_text = tk.Text(self.main_frame, wrap=tk.WORD, width=20, height=10)
+        self.strategy_text.place(x=220, y=30)
+        self.strategy_text.insert(tk.END, "Fetching prices...\n")
+        self.strategy_engine = StrategyEngine()
+
+        self.prices_text = tk.Text(self.prices_frame, wrap=tk.WORD)
+        self.prices_text.pack(fill='both', expand=True)
+        self.fetch_prices_button = tk.Button(self.prices_frame, text="Fetch Prices", command=self.update_prices)
+        self.fetch_prices_button.pack()
+
+        self.metrics_text = tk.Text(self.metrics_frame, wrap=tk.NONE, font=("Courier", 9))
+        self.metrics_text.pack(fill='both', expand=True)
+        self.show_metrics()
+
+        # Prices arrive on the refresher thread; hand them to the Tk thread
+        self.price_service = get_price_service()
+        self.price_service.subscribe(lambda items: self.root.after(0, self.show_prices, items))
+        self.price_service.start()
+
+    def toggle_bot(self):
+        if not self.running:
+            self.running = True
+            self.start_button.config(text="Stop")
+            item = self.item_var.get()
+            item_count = int(self.item_count_entry.get().replace("Max. ", "").strip())
+            want_item = self.want_item_var.get()
+            want_item_count = int(self.want_item_count_entry.get().replace("Max. ", "").strip())
+            self.stop_event.clear()
+            # The bot waits start_delay seconds itself, so the window stays responsive while the game is focused
+            self.bot_thread = threading.Thread(target=bot.perform_trade,
+                                               args=(item, item_count, want_item, want_item_count, self.stop_event,
+                                                     bot.start_delay))
+            self.bot_thread.start()
+        else:
+            self.running = False
+            self.start_button.config(text="Start")
+            self.stop_event.set()
+
+    def update_trade_count(self):
+        self.trades_completed += 1
+        self.trade_count_label.config(text=f"Trades Completed: {self.trades_completed}")
+
+    # Journal records arrive on the bot thread; count finished trades on the Tk thread
+    def on_journal_record(self, record):
+        if record["event"] == "state" and record.get("to") == "done":
+            self.update_trade_count()
+
+    def update_prices(self):
+        self.price_service.request_refresh()
+
+    def show_prices(self, items):
+        self.prices_text.delete(1.0, tk.END)
+        if items:
+            for name, price, image_url in items:
+                self.prices_text.insert(tk.END, f"{name}: {price}\n")
+        else:
+            self.prices_text.insert(tk.END, "No prices found.\n")
+        self.fetch_strategy_suggestions(items)
+
+    # Refresh the metrics tab every couple of seconds
+    def show_metrics(self):
+        snapshot = get_metrics().snapshot()
+        self.metrics_text.delete(1.0, tk.END)
+        self.metrics_text.insert(tk.END, f"{'stage':22s}{'n':>6s}{'p50 ms':>9s}{'p95 ms':>9s}{'max ms':>9s}\n")
+        for stage, stats in sorted(snapshot["stages"].items(), key=lambda entry: -entry[1]["total"]):
+            self.metrics_text.insert(tk.END, f"{stage[:22]:22s}{stats['count']:6d}{stats['p50'] * 1000:9.1f}"
+                                             f"{stats['p95'] * 1000:9.1f}{stats['max'] * 1000:9.1f}\n")
+        for name, value in sorted(snapshot["counters"].items()):
+            self.metrics_text.insert(tk.END, f"{name}: {value}\n")
+        self.root.after(2000, self.show_metrics)
+
+    def clear_placeholder(self, event):
+        if "Max." in event.widget.get():
+            event.widget.delete(0, tk.END)
+
+    def set_placeholder(self, event):
+        if event.widget.get() == "":
+            event.widget.insert(0, "Max. 99")
+
+    def fetch_strategy_suggestions(self, items):
+        try:
+            self.strategy_text.delete(1.0, tk.END)
+            self.strategy_engine.update_prices(prices_for_items(items))
+            suggestions = self.strategy_engine.suggestions()
+            if suggestions:
+                for suggestion in suggestions:
+                    self.strategy_text.insert(tk.END, f"{suggestion}\n")
+            else:
+                self.strategy_text.insert(tk.END, "No strategies found.\n")
+        except Exception as e:
+            logging.error(f"Failed to fetch strategy suggestions: {str(e)}")
+            self.strategy_text.insert(tk.END, "Failed to fetch strategies.\n")
+
+# Start the metrics exporter and run the Tk window until it is closed
+def main():
+    try:
+        get_metrics().start_exporter(bot.metrics_file)
+        root = tk.Tk()
+        app = BotApp(root)
+        root.mainloop()
+    except Exception as e:
+        logging.critical(f"Script terminated unexpectedly: {str(e)}")
+        logging.critical(traceback.format_exc())
+        print(f"Script terminated unexpectedly: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import cv2
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# Directory debug frames are written to
+debug_dir = r"debug"
+
+# Sampling mode: "off", "on-error", "every-N" (e.g. "every-50") or "always"
+debug_mode = os.environ.get("TRADEBOT_DEBUG_ARTIFACTS", "on-error")
+
+# Number of debug frames kept, both in memory and on disk
+debug_keep = 20
+
+# Maximum number of frames waiting to be written before new ones are dropped
+debug_queue_size = 32
+
+# Split a mode string into (mode, every_n)
+def parse_mode(mode):
+    mode = (mode or "off").strip().lower()
+    if mode.startswith("every-"):
+        try:
+            return "every", max(1, int(mode.split("-", 1)[1]))
+        except ValueError:
+            logging.error(f"Invalid debug artifact mode {mode}, using on-error")
+            return "on-error", 1
+    if mode not in ("off", "on-error", "always"):
+        logging.error(f"Invalid debug artifact mode {mode}, using on-error")
+        return "on-error", 1
+    return mode, 1
+
+# Samples debug frames on the hot path and writes them from a background thread
+class DebugArtifacts:
+    def __init__(self, mode=debug_mode, output_dir=debug_dir, keep=debug_keep, queue_size=debug_queue_size):
+        self.mode, self.every_n = parse_mode(mode)
+        self.output_dir = output_dir
+        self.keep = keep
+        self.recent = deque(maxlen=keep)
+        self.written = deque()
+        self.dropped = 0
+        self.saved = 0
+        self._counts = {}
+        self._seq = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # Offer a frame; it is copied and queued only if the sampling mode selects it
+    def capture(self, label, image):
+        if self.mode == "off" or image is None:
+            return
+        if self.mode == "on-error":
+            with self._lock:
+                self.recent.append((label, time.time(), image.copy()))
+            return
+        if self.mode == "every":
+            with self._lock:
+                count = self._counts.get(label, 0)
+                self._counts[label] = count + 1
+            if count % self.every_n:
+                return
+        self._enqueue(label, time.time(), image.copy())
+
+    # Flush the frames leading up to a recognition error
+    def error(self, reason):
+        if self.mode == "off":
+            return
+        logging.info(f"Saving debug frames after error: {reason}")
+        with self._lock:
+            frames = list(self.recent)
+            self.recent.clear()
+        for label, timestamp, image in frames:
+            self._enqueue(label, timestamp, image)
+
+    def _enqueue(self, label, timestamp, image):
+        self._start()
+        try:
+            self._queue.put_nowait((label, timestamp, image))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    os.makedirs(self.output_dir, exist_ok=True)
+                    self._thread = threading.Thread(target=self._run, name="debug-artifacts", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logging.error(f"Failed to write debug frame: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    # Write one frame and delete the oldest once more than `keep` are on disk
+    def _write(self, label, timestamp, image):
+        self._seq += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp))
+        filename = os.path.join(self.output_dir, f'{label}_{stamp}_{self._seq}.png')
+        cv2.imwrite(filename, image)
+        self.saved += 1
+        self.written.append(filename)
+        while len(self.written) > self.keep:
+            old = self.written.popleft()
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    # Wait until every queued frame is written
+    def flush(self):
+        if self._thread is not None:
+            self._queue.join()
+
+    # Stop the writer thread after the queue drains
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+_artifacts = None
+_artifacts_lock = threading.Lock()
+
+# Shared debug artifact writer
+def get_debug_artifacts():
+    global _artifacts
+    if _artifacts is None:
+        with _artifacts_lock:
+            if _artifacts is None:
+                _artifacts = DebugArtifacts()
+    return _artifacts
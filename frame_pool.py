@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+import threading
+from collections import OrderedDict
+
+# Buffers kept per thread; the least recently used one is dropped beyond this
+frame_pool_size = 16
+
+# Reusable uint8 buffers keyed by (tag, shape), one set per thread so capture threads never share one.
+# A buffer handed out stays valid until the same thread asks for the same tag and shape again; callers
+# that keep an image longer must copy it. Crops of pooled frames are plain numpy views.
+class FramePool:
+    def __init__(self, max_buffers=frame_pool_size):
+        self.max_buffers = max_buffers
+        self.allocations = 0
+        self.reuses = 0
+        self.allocated_bytes = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _buffers(self):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = OrderedDict()
+        return buffers
+
+    # Buffer of the given shape for one use (tag) on this thread
+    def buffer(self, shape, tag="frame"):
+        buffers = self._buffers()
+        key = (tag, tuple(shape))
+        buffer = buffers.get(key)
+        if buffer is not None:
+            buffers.move_to_end(key)
+            with self._lock:
+                self.reuses += 1
+            return buffer
+        buffer = buffers[key] = np.empty(shape, np.uint8)
+        while len(buffers) > self.max_buffers:
+            buffers.popitem(last=False)
+        with self._lock:
+            self.allocations += 1
+            self.allocated_bytes += buffer.nbytes
+        return buffer
+
+    # cv2.cvtColor into a pooled buffer
+    def convert(self, image, code, tag="frame"):
+        if code in (cv2.COLOR_BGR2GRAY, cv2.COLOR_RGB2GRAY, cv2.COLOR_BGRA2GRAY, cv2.COLOR_RGBA2GRAY):
+            shape = image.shape[:2]
+        else:
+            shape = image.shape[:2] + (3,)
+        return cv2.cvtColor(image, code, dst=self.buffer(shape, tag))
+
+    # Grayscale version of an image, converted into a pooled buffer when it is in color
+    def gray(self, image, tag="gray"):
+        return image if image.ndim == 2 else self.convert(image, cv2.COLOR_BGR2GRAY, tag)
+
+    # cv2.pyrDown into a pooled buffer
+    def pyr_down(self, image, tag="pyramid"):
+        shape = ((image.shape[0] + 1) // 2, (image.shape[1] + 1) // 2) + image.shape[2:]
+        return cv2.pyrDown(image, dst=self.buffer(shape, tag))
+
+    # {"allocations", "reuses", "allocated_mb"}
+    def stats(self):
+        with self._lock:
+            return {"allocations": self.allocations, "reuses": self.reuses,
+                    "allocated_mb": self.allocated_bytes / 1e6}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Shared frame pool
+def get_frame_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = FramePool()
+    return _pool
@@ -0,0 +1,116 @@
+import time
+
+# Taken before anything else is imported, so the startup report covers the whole process
+process_started = time.perf_counter()
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import traceback
+
+# Parse "dino_egg:3" into ("dino_egg", 3)
+def parse_offer(text):
+    item, _, amount = text.partition(':')
+    try:
+        amount = int(amount) if amount else 1
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid count in {text!r}, expected ITEM:COUNT")
+    if not 1 <= amount <= 99:
+        raise argparse.ArgumentTypeError(f"count in {text!r} must be between 1 and 99")
+    return item, amount
+
+# Apply {"inventory_coords": [x, y, w, h], ...} through the layout, which hands the regions to every
+# module using them and keeps them moving with their anchors
+def apply_coordinates(overrides):
+    from layout import get_layout
+    get_layout().configure(overrides)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the trade bot without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="advertise and complete trades until stopped")
+    run.add_argument("--sell", type=parse_offer, required=True, metavar="ITEM:COUNT", help="item and count to give")
+    run.add_argument("--buy", type=parse_offer, required=True, metavar="ITEM:COUNT", help="item and count to get")
+    run.add_argument("--delay", type=float, default=0, help="seconds to wait before the first advert")
+
+    check = commands.add_parser("check", help="print what recognition finds on the current screen and exit")
+
+    for command in (run, check):
+        command.add_argument("--frame", help="read the screen from a recorded frame instead of the desktop")
+        command.add_argument("--metrics-file", help="periodically write stage timings to this file")
+        command.add_argument("--instance", help="instance name, keeps log, state and metrics files apart")
+        command.add_argument("--coords", type=json.loads, default={},
+                             help='JSON coordinate overrides (any layout region, including trade_slot_regions), '
+                                  'e.g. \'{"inventory_coords": [2029, 225, 288, 220]}\'')
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Read when the modules below are imported or first used
+    if args.frame:
+        os.environ["TRADEBOT_SCREEN_SOURCE"] = args.frame
+    if args.instance:
+        os.environ["TRADEBOT_INSTANCE"] = args.instance
+
+    import_start = time.perf_counter()
+    import TradeBot as bot
+    from metrics import get_metrics
+    from template_bank import get_template_bank, item_templates
+    imported = time.perf_counter()
+    try:
+        apply_coordinates(args.coords)
+    except ValueError as e:
+        parser.error(str(e))
+    get_template_bank()
+    templates_loaded = time.perf_counter()
+
+    metrics = get_metrics()
+    metrics.observe('startup_imports', imported - import_start)
+    metrics.observe('startup_templates', templates_loaded - imported)
+    metrics.start_exporter(args.metrics_file or bot.metrics_file)
+    startup = (f"Started in {(templates_loaded - process_started) * 1000:.0f} ms "
+               f"(imports {(imported - import_start) * 1000:.0f} ms, "
+               f"templates {(templates_loaded - imported) * 1000:.0f} ms)")
+    logging.info(startup)
+    print(startup)
+
+    if args.command == "check":
+        bot.test_image_recognition()
+        return 0
+
+    (item, item_count), (want_item, want_item_count) = args.sell, args.buy
+    for name in (item, want_item):
+        if name not in item_templates:
+            parser.error(f"unknown item {name!r}, expected one of {', '.join(item_templates)}")
+
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        logging.info(f"Received signal {signum}, stopping.")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        worker = threading.Thread(target=bot.perform_trade, name="trade-bot",
+                                  args=(item, item_count, want_item, want_item_count, stop_event, args.delay))
+        worker.start()
+        # Join in short steps so the signal handlers get to run
+        while worker.is_alive():
+            worker.join(0.5)
+        return 0
+    except Exception as e:
+        logging.critical(f"Headless bot terminated unexpectedly: {str(e)}")
+        logging.critical(traceback.format_exc())
+        print(f"Headless bot terminated unexpectedly: {str(e)}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
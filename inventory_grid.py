@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+import os
+import threading
+from frame_pool import get_frame_pool
+from metrics import count, timed
+from screen_source import get_screen_source, offset_region, union_region
+from template_bank import get_template_bank
+
+# Scan the inventory cell by cell instead of sweeping every template over the whole region
+grid_scan = os.environ.get("TRADEBOT_GRID_SCAN", "1") != "0"
+
+# Centers of the item cells of one inventory page, relative to inventory_coords, measured on the
+# reference setup (images/fewfewfew.PNG). The hand is drawn in perspective, so the rows are not an
+# even lattice: the lower two rows step (58, 36) per cell, the top row (64, 32).
+inventory_cells = [
+    (40, 110), (98, 146), (156, 180),
+    (80, 78), (138, 116), (196, 150),
+    (124, 50), (188, 82), (252, 114),
+]
+
+# Box searched around a cell center as (left, top, right, bottom) offsets. Items stand on their cell,
+# so the box reaches further up than down. A neighbouring item never fits into it completely.
+cell_box = (-42, -56, 42, 40)
+
+# Bits kept per color channel for the color signature (3 bits: 512 bins)
+signature_bits = 3
+
+# Share of an item's own colors a cell must contain before it is compared against the template
+shortlist_threshold = 0.75
+
+# Histogram of the quantized BGR colors of an image
+def color_signature(image):
+    shift = 8 - signature_bits
+    q = (image >> shift).astype(np.uint16)
+    index = (q[..., 0] << (2 * signature_bits)) | (q[..., 1] << signature_bits) | q[..., 2]
+    return np.bincount(index.ravel(), minlength=1 << (3 * signature_bits))
+
+# Color signature of an item template without its background: every color found on the template's
+# border (the hand it was cropped from) is dropped, so only the item's own colors are compared
+def item_signature(template):
+    signature = color_signature(template)
+    border = np.concatenate([template[0], template[-1], template[:, 0], template[:, -1]])
+    signature[color_signature(border[None]) > 0] = 0
+    return signature
+
+# Cell regions on screen for an inventory region
+def cell_regions(inventory_coords, cells=None, box=cell_box):
+    cells = inventory_cells if cells is None else cells
+    x0, y0 = inventory_coords[:2]
+    left, top, right, bottom = box
+    return [(x0 + cx + left, y0 + cy + top, right - left, bottom - top) for cx, cy in cells]
+
+# Classifies each inventory cell on its own. Every cell is first checked against a color signature per
+# item (a few histogram minima), and only the items whose colors the cell actually contains get a
+# template comparison inside that cell. Each cell holds at most one item, so the result needs no
+# peak suppression and costs a handful of small matches instead of one full sweep per template.
+class InventoryGrid:
+    def __init__(self, cells=None, box=cell_box, bank=None):
+        self.cells = inventory_cells if cells is None else cells
+        self.box = box
+        self.bank = bank
+        self.signatures = {}
+        self._lock = threading.Lock()
+
+    def _bank(self):
+        return self.bank if self.bank is not None else get_template_bank()
+
+    # Color signatures of the items, computed on first use
+    def _signatures(self, items):
+        missing = [item for item in items if item not in self.signatures]
+        if missing:
+            bank = self._bank()
+            with self._lock:
+                for item in missing:
+                    color = bank.items_inventory_color.get(item)
+                    if color is not None:
+                        self.signatures[item] = item_signature(color)
+        names = [item for item in items if item in self.signatures]
+        return names, np.stack([self.signatures[item] for item in names]) if names else None
+
+    # (item, score, (x, y) in the cell) of the best shortlisted item in one cell, or None
+    def classify(self, cell_color, cell_gray, items, threshold):
+        names, signatures = self._signatures(items)
+        if not names:
+            return None
+        contained = np.minimum(color_signature(cell_color), signatures).sum(axis=1) / signatures.sum(axis=1)
+        shortlist = [index for index in np.argsort(-contained) if contained[index] >= shortlist_threshold]
+        count('grid_prefilter_rejected', len(names) - len(shortlist))
+        best = None
+        templates = self._bank().items_inventory
+        for index in shortlist:
+            template = templates[names[index]]
+            if template.shape[0] > cell_gray.shape[0] or template.shape[1] > cell_gray.shape[1]:
+                continue
+            count('grid_template_matches')
+            _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(cell_gray, template, cv2.TM_CCOEFF_NORMED))
+            if score >= threshold and (best is None or score > best[1]):
+                best = (names[index], score, (x + template.shape[1] // 2, y + template.shape[0] // 2))
+        return best
+
+    # Capture the cells once and classify each: ({item: (count, positions)}, grayscale inventory region)
+    @timed('inventory_grid')
+    def scan(self, inventory_coords, items, threshold, source=None):
+        source = source if source is not None else get_screen_source()
+        cells = cell_regions(inventory_coords, self.cells, self.box)
+        region = union_region([tuple(inventory_coords)] + cells)
+        color = source.grab(region)
+        gray = get_frame_pool().gray(color, "inventory_gray")
+        found = {item: [] for item in items}
+        for cell in cells:
+            x, y, w, h = offset_region(cell, region[:2])
+            best = self.classify(color[y:y + h, x:x + w], gray[y:y + h, x:x + w], items, threshold)
+            if best is not None:
+                found[best[0]].append((cell[0] + best[2][0], cell[1] + best[2][1]))
+        x, y, w, h = offset_region(inventory_coords, region[:2])
+        return {item: (len(positions), positions) for item, positions in found.items()}, gray[y:y + h, x:x + w]
+
+_grid = None
+_grid_lock = threading.Lock()
+
+# Shared inventory grid
+def get_inventory_grid():
+    global _grid
+    if _grid is None:
+        with _grid_lock:
+            if _grid is None:
+                _grid = InventoryGrid()
+    return _grid
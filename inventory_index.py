@@ -0,0 +1,122 @@
+import cv2
+import logging
+import zlib
+from inventory_scan import scan_inventory
+from screen_source import get_screen_source
+from template_bank import get_template_bank
+
+# Most pages a sweep will walk through before giving up
+max_pages = 10
+
+# Cheap fingerprint of an inventory page, used to notice when paging wrapped around
+def page_signature(gray):
+    return zlib.crc32(cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).tobytes())
+
+# Remembers which inventory page holds which items so trades can jump straight to them
+class InventoryIndex:
+    def __init__(self, inventory_coords, next_page, items=None, source=None, max_pages=max_pages):
+        self.inventory_coords = inventory_coords
+        self.next_page = next_page
+        self.items = list(items) if items is not None else list(get_template_bank().items_inventory)
+        self.source = source
+        self.max_pages = max_pages
+        self.pages = {}
+        self.page_count = None
+        self.wraps = False
+        self.current_page = 0
+        self.page_turns = 0
+
+    def _source(self):
+        return self.source if self.source is not None else get_screen_source()
+
+    # Scan the visible page for every tracked item and record the result
+    def scan_page(self):
+        counts, gray = scan_inventory(self.inventory_coords, self.items, self._source())
+        found = {item: positions for item, (count, positions) in counts.items() if count}
+        self.pages[self.current_page] = found
+        return found, page_signature(gray)
+
+    # Turn one page forward, keeping track of where we are
+    def turn_page(self):
+        if not self.next_page():
+            return False
+        self.page_turns += 1
+        self.current_page += 1
+        if self.page_count is not None and self.wraps:
+            self.current_page %= self.page_count
+        return True
+
+    # Walk every page once and rebuild the index
+    def sweep(self):
+        self.pages = {}
+        self.page_count = None
+        self.wraps = False
+        self.current_page = 0
+        _, first_signature = self.scan_page()
+        previous_signature = first_signature
+        for _ in range(self.max_pages - 1):
+            # A page turn that changed nothing means we are on the last page
+            if not self.turn_page():
+                break
+            found, signature = self.scan_page()
+            if signature == first_signature:
+                # Back on the first page: the inventory wraps around
+                del self.pages[self.current_page]
+                self.page_count = self.current_page
+                self.wraps = True
+                self.current_page = 0
+                break
+            if signature == previous_signature:
+                # Still the same page (the turn was not noticed in time); it is the last one
+                del self.pages[self.current_page]
+                self.current_page -= 1
+                break
+            previous_signature = signature
+        if self.page_count is None:
+            self.page_count = self.current_page + 1
+        logging.info(f"Inventory sweep: {self.page_count} pages, wraps: {self.wraps}, "
+                     f"items: { {page: {item: len(p) for item, p in found.items()} for page, found in self.pages.items()} }")
+
+    # Move to a page; False if it is behind us and paging does not wrap
+    def goto(self, page):
+        if page == self.current_page:
+            return True
+        if page < self.current_page and not self.wraps:
+            return False
+        while self.current_page != page:
+            if not self.turn_page():
+                return False
+        return True
+
+    # Pages the index believes hold the item, visible page first
+    def pages_with(self, item):
+        pages = [page for page, found in self.pages.items() if found.get(item)]
+        pages.sort(key=lambda page: (page != self.current_page, (page - self.current_page) % (self.page_count or 1)))
+        return pages
+
+    # Screen positions of the item, paging to it; sweeps the inventory if the index is out of date
+    def find(self, item):
+        found, _ = self.scan_page()
+        if found.get(item):
+            return found[item]
+        for swept in (False, True):
+            if swept:
+                self.sweep()
+                if self.pages.get(self.current_page, {}).get(item):
+                    return self.pages[self.current_page][item]
+            for page in self.pages_with(item):
+                if page == self.current_page or not self.goto(page):
+                    continue
+                found, _ = self.scan_page()
+                if found.get(item):
+                    return found[item]
+        return []
+
+    # Forget positions of items that were moved into the trade window
+    def remove(self, item, positions):
+        found = self.pages.get(self.current_page, {})
+        remaining = [p for p in found.get(item, []) if p not in positions]
+        if remaining:
+            found[item] = remaining
+        else:
+            found.pop(item, None)
@@ -0,0 +1,95 @@
+import cv2
+import logging
+import numpy as np
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from inventory_grid import get_inventory_grid, grid_scan
+from metrics import timed
+from recognition_pool import get_recognition_client
+from screen_source import get_screen_source
+from template_bank import get_template_bank
+
+# Score threshold for an inventory item match
+match_threshold = 0.6
+
+# Minimum distance in pixels between two detections of the same item
+min_distance = 10
+
+# Local maxima of a matchTemplate result above the threshold, at least min_distance apart
+def find_peaks(result, threshold=match_threshold, min_distance=min_distance):
+    if result.size == 0 or result.max() < threshold:
+        return []
+    size = 2 * min_distance + 1
+    local_max = cv2.dilate(result, np.ones((size, size), np.uint8))
+    ys, xs = np.nonzero((result >= threshold) & (result >= local_max))
+    if len(xs) == 0:
+        return []
+
+    # Plateaus leave several equal maxima close together; keep the strongest per neighbourhood
+    order = np.argsort(-result[ys, xs], kind='stable')
+    min_distance_sq = min_distance * min_distance
+    buckets = {}
+    kept = []
+    for i in order:
+        x, y = int(xs[i]), int(ys[i])
+        cx, cy = x // min_distance, y // min_distance
+        if any((x - px) ** 2 + (y - py) ** 2 < min_distance_sq
+               for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+               for px, py in buckets.get((cx + dx, cy + dy), ())):
+            continue
+        buckets.setdefault((cx, cy), []).append((x, y))
+        kept.append((x, y))
+    kept.sort(key=lambda point: (point[1], point[0]))
+    return kept
+
+# Centered screen positions of every match of a grayscale template in a grayscale capture
+def find_item_positions(screenshot_gray, template, origin=(0, 0), threshold=match_threshold):
+    if screenshot_gray.shape[0] < template.shape[0] or screenshot_gray.shape[1] < template.shape[1]:
+        return []
+    result = cv2.matchTemplate(screenshot_gray, template, cv2.TM_CCOEFF_NORMED)
+    points = find_peaks(result, threshold)
+    return [(x + origin[0] + template.shape[1] // 2, y + origin[1] + template.shape[0] // 2) for x, y in points]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Worker threads for matching several templates at once (matchTemplate releases the GIL)
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                               thread_name_prefix="inventory-scan")
+    return _executor
+
+# Detect every item of a {item: template} map in one grayscale capture: {item: (count, positions)}
+@timed('inventory_match')
+def scan_items(screenshot_gray, templates, origin=(0, 0), threshold=match_threshold):
+    items = list(templates)
+    if len(items) > 1 and (os.cpu_count() or 1) > 1:
+        results = _get_executor().map(
+            lambda item: find_item_positions(screenshot_gray, templates[item], origin, threshold), items)
+    else:
+        results = (find_item_positions(screenshot_gray, templates[item], origin, threshold) for item in items)
+    return {item: (len(positions), positions) for item, positions in zip(items, results)}
+
+# Capture the inventory once and detect every item (all inventory templates by default)
+def scan_inventory(inventory_coords, items=None, source=None, threshold=match_threshold):
+    bank = get_template_bank()
+    items = bank.items_inventory if items is None else {item: bank.items_inventory[item] for item in items
+                                                         if item in bank.items_inventory}
+    source = source if source is not None else get_screen_source()
+    # Classifying the cells is cheap enough to stay local, even under the supervisor
+    if grid_scan:
+        return get_inventory_grid().scan(inventory_coords, list(items), threshold, source)
+    screenshot_gray = source.grab(inventory_coords, gray=True)
+    # Under the supervisor the matching runs on its shared process pool
+    client = get_recognition_client()
+    if client is not None:
+        try:
+            return client.scan(screenshot_gray, list(items), inventory_coords[:2], threshold), screenshot_gray
+        except Exception as e:
+            logging.error(f"Remote inventory scan failed, scanning locally: {str(e)}")
+    return scan_items(screenshot_gray, items, inventory_coords[:2], threshold), screenshot_gray
@@ -0,0 +1,149 @@
+import cv2
+import numpy as np
+import logging
+import threading
+import traceback
+from debug_artifacts import get_debug_artifacts
+from log_setup import subsystem
+from metrics import timed
+from recognition_cache import get_recognition_cache
+from screen_source import get_screen_source, offset_region
+from template_bank import get_template_bank, load_templates
+
+# Coordinates for the trade slots
+your_slot_coords = (1640, 497, 21, 20)
+their_slot_coords = (1306, 498, 21, 20)
+
+log = subsystem("recognition")
+
+# Seconds between two reads of the trade slots
+counter_interval = 0.5
+
+# A slot that is not empty but whose best digit scores below this is probably misread; it is kept as a
+# debug artifact together with the frames before it
+ambiguous_score = 0.8
+
+# Latest trade slot counts, shared between the counter and the trade flow
+class CountChannel:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.counts = {"your_item_count": 0, "their_item_count": 0}
+        self.seq = 0
+
+    # Publish a new reading and wake waiters if a count changed
+    def publish(self, your_item_count, their_item_count):
+        counts = {"your_item_count": your_item_count, "their_item_count": their_item_count}
+        with self._condition:
+            self.seq += 1
+            changed = counts != self.counts
+            self.counts = counts
+            if changed:
+                self._condition.notify_all()
+
+    # Current value of one count
+    def get(self, key, default=0):
+        with self._condition:
+            return self.counts.get(key, default)
+
+    # (sequence number, counts) of the latest reading
+    def snapshot(self):
+        with self._condition:
+            return self.seq, dict(self.counts)
+
+    # Block until predicate(counts) holds; False on timeout
+    def wait_for(self, predicate, timeout=None):
+        with self._condition:
+            return self._condition.wait_for(lambda: predicate(self.counts), timeout)
+
+    # Block until a count reaches at least value; False on timeout
+    def wait_at_least(self, key, value, timeout=None):
+        return self.wait_for(lambda counts: counts.get(key, 0) >= value, timeout)
+
+# Function to preprocess an image
+def preprocess_image(image):
+    if len(image.shape) == 2:
+        return image
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return gray
+
+# Function to match a template; returns the best label and its score
+def match_template(image, templates):
+    best_match = None
+    # A flat crop (an empty slot) correlates with nothing and keeps no label, as in slot_reader
+    max_val = 0
+    for label, template in templates.items():
+        if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+            log.debug("Template %s is larger than the image region.", label)
+            continue
+        result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        _, max_loc_val, _, _ = cv2.minMaxLoc(result)
+        if max_loc_val > max_val:
+            max_val = max_loc_val
+            best_match = label
+    log.debug("Best match: %s with value: %s", best_match, max_val)
+    return best_match, max_val
+
+# Function to check if the slot image is blank
+def is_blank_image(image):
+    gray_image = preprocess_image(image)
+    # Blank reference comes pre-sized to the slot from the shared template bank
+    blank_image = get_template_bank().blank(gray_image.shape)
+
+    # Check if the image matches the blank reference image
+    is_blank = np.array_equal(gray_image, blank_image)
+    log.debug("Is blank image: %s", is_blank)
+    return is_blank
+
+# Save an ambiguous slot crop and flush the frames leading up to it
+def report_ambiguous_slot(label, slot_region, matched_number, score):
+    log.warning("Ambiguous %s read as %s (score %.2f)", label, matched_number, score)
+    get_debug_artifacts().capture(f"{label}_ambiguous", slot_region)
+    get_debug_artifacts().error(f"Ambiguous {label} read")
+
+# Number shown in a slot crop (0 for a blank slot)
+def recognize_slot(slot_region, templates, label="slot"):
+    gray_slot = preprocess_image(slot_region)
+    if is_blank_image(slot_region):
+        return 0
+    matched_number, score = match_template(gray_slot, templates)
+    if matched_number is None or matched_number == 'Empty':
+        return 0
+    if score < ambiguous_score:
+        report_ambiguous_slot(label, slot_region, matched_number, score)
+    return int(matched_number.split('_')[-1])
+
+# Function to read a number from a trade slot. The slot pixels rarely change between reads,
+# so each distinct crop is recognized once and served from the recognition cache afterwards.
+def read_number_from_trade_slot(screen, slot_coords, templates, label):
+    x, y, w, h = slot_coords
+    slot_region = screen[y:y + h, x:x + w]
+    get_debug_artifacts().capture(label, slot_region)
+    return get_recognition_cache().lookup(id(templates), slot_region,
+                                          lambda crop: recognize_slot(crop, templates, label))
+
+# Read both trade slot counts from the screen
+@timed('trade_counts')
+def read_trade_counts(templates_me, templates_other):
+    screenshot, origin = get_screen_source().grab_regions([your_slot_coords, their_slot_coords], gray=True)
+    your_item_count = read_number_from_trade_slot(screenshot, offset_region(your_slot_coords, origin), templates_me, 'Your_Item')
+    their_item_count = read_number_from_trade_slot(screenshot, offset_region(their_slot_coords, origin), templates_other, 'Their_Item')
+    return your_item_count, their_item_count
+
+# Keep publishing trade slot counts to the channel until stopped
+def run_counter(channel, stop_event, interval=counter_interval):
+    templates_me, templates_other = load_templates()
+    while not stop_event.is_set():
+        try:
+            channel.publish(*read_trade_counts(templates_me, templates_other))
+        except Exception as e:
+            logging.error(f"Item counter encountered an error: {str(e)}")
+            logging.error(traceback.format_exc())
+            get_debug_artifacts().error("Item counter encountered an error")
+        stop_event.wait(interval)
+
+# Run the counter as a daemon thread inside the bot process
+def start_counter_thread(channel, stop_event, interval=counter_interval):
+    thread = threading.Thread(target=run_counter, args=(channel, stop_event, interval),
+                              name="item-counter", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,153 @@
+import threading
+import time
+import item_counter
+import slot_reader
+from anchors import get_anchor_cache
+from log_setup import subsystem
+
+log = subsystem("recognition")
+
+# Where each anchor sits in the reference setup (images/fewfewfew.PNG) the hard-coded coordinates come from
+reference_anchors = {
+    "my_item_box": (1571, 447),
+    "next_page_button": (2180, 190),
+}
+
+# Every screen region as (anchor it moves with, region in the reference setup)
+layout_regions = {
+    "your_slot_coords": ("my_item_box", (1640, 497, 21, 20)),
+    "their_slot_coords": ("my_item_box", (1306, 498, 21, 20)),
+    "blank_slot_coords": ("my_item_box", (1287, 528, 61, 60)),
+    "inventory_coords": ("next_page_button", (2029, 225, 288, 220)),
+    "trade_slot_regions": ("my_item_box", slot_reader.trade_slot_regions),
+}
+
+# Seconds before a missing anchor is searched for on the whole screen again
+missing_retry = 5
+
+# Region as tuples: (x, y, w, h) or a list of them
+def _region(value):
+    if value and isinstance(value[0], (list, tuple)):
+        return [tuple(entry) for entry in value]
+    return tuple(value)
+
+def _shift(region, dx, dy):
+    if isinstance(region, list):
+        return [_shift(entry, dx, dy) for entry in region]
+    x, y, w, h = region
+    return x + dx, y + dy, w, h
+
+# Regions of the modules that do not import this one
+def _apply_recognition_regions(regions):
+    for name in ("your_slot_coords", "their_slot_coords"):
+        if name in regions:
+            setattr(item_counter, name, regions[name])
+    if "trade_slot_regions" in regions:
+        slot_reader.set_trade_slot_regions(regions["trade_slot_regions"])
+
+# Derives every region from the anchors' current positions. Calibrating costs one full-screen search
+# per anchor; checking afterwards only re-verifies the anchors in a small ROI (see AnchorCache), so the
+# per-frame reads stay plain crops. A moved or lost anchor triggers recalibration of its regions.
+class Layout:
+    def __init__(self, cache=None, anchors=reference_anchors, regions=layout_regions):
+        self.cache = cache
+        self.reference = dict(anchors)
+        self.layout = dict(regions)
+        # Anchor position each region's configured coordinates belong to; None until the anchor is seen
+        self.pinned = {name: self.reference[anchor] for name, (anchor, _) in self.layout.items()}
+        self.positions = {}
+        self.regions = {}
+        self.listeners = [_apply_recognition_regions]
+        self.recalibrations = 0
+        self._missing_since = {}
+        self._lock = threading.Lock()
+
+    def _cache(self):
+        return self.cache if self.cache is not None else get_anchor_cache()
+
+    # Call listener({name: region}) with the regions that moved, on every recalibration
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, changed):
+        for listener in list(self.listeners):
+            try:
+                listener(changed)
+            except Exception as e:
+                log.error(f"Layout listener failed: {str(e)}")
+
+    # Replace the configured coordinates of some regions, e.g. {"inventory_coords": [x, y, w, h]}.
+    # They are used as given until their anchor is found; from then on they move with it.
+    def configure(self, overrides):
+        unknown = [name for name in overrides if name not in self.layout]
+        if unknown:
+            raise ValueError(f"unknown coordinate {unknown[0]!r}, expected one of {', '.join(self.layout)}")
+        changed = {}
+        with self._lock:
+            for name, region in overrides.items():
+                region = _region(region)
+                self.layout[name] = (self.layout[name][0], region)
+                self.pinned[name] = None
+                self.regions[name] = changed[name] = region
+            # Pin them to the anchors already found
+            for name in changed:
+                anchor = self.layout[name][0]
+                if anchor in self.positions:
+                    self.pinned[name] = self.positions[anchor]
+        if changed:
+            self._notify(changed)
+        return changed
+
+    # Locate the anchors (all by default); returns the regions that changed
+    def calibrate(self, anchors=None):
+        changed = {}
+        with self._lock:
+            for anchor in anchors or self.reference:
+                box = self._cache().locate(anchor)
+                if box is None:
+                    self._missing_since[anchor] = time.monotonic()
+                    continue
+                self._missing_since.pop(anchor, None)
+                position = (box.left, box.top)
+                if self.positions.get(anchor) == position:
+                    continue
+                self.positions[anchor] = position
+                for name, (region_anchor, region) in self.layout.items():
+                    if region_anchor != anchor:
+                        continue
+                    if self.pinned[name] is None:
+                        self.pinned[name] = position
+                    pinned = self.pinned[name]
+                    shifted = _shift(region, position[0] - pinned[0], position[1] - pinned[1])
+                    if self.regions.get(name) != shifted:
+                        self.regions[name] = changed[name] = shifted
+                log.info("Layout anchor %s at %s", anchor, position)
+            if changed:
+                self.recalibrations += 1
+        if changed:
+            self._notify(changed)
+        return changed
+
+    # Cheap per-frame check: anchors found last time are re-verified in their ROI; anchors that are
+    # missing are only searched for again every missing_retry seconds
+    def check(self):
+        now = time.monotonic()
+        due = [anchor for anchor in self.reference
+               if now - self._missing_since.get(anchor, -missing_retry) >= missing_retry]
+        return self.calibrate(due) if due else {}
+
+    # Current region by name, or None before its anchor was found
+    def region(self, name):
+        return self.regions.get(name)
+
+_layout = None
+_layout_lock = threading.Lock()
+
+# Shared layout
+def get_layout():
+    global _layout
+    if _layout is None:
+        with _layout_lock:
+            if _layout is None:
+                _layout = Layout()
+    return _layout
@@ -0,0 +1,144 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+# Size at which a log file is rotated, and how many rotated files are kept
+log_max_bytes = 5 * 1024 * 1024
+log_backups = 5
+
+# Rotate by time instead of size (e.g. "midnight"); None keeps size-based rotation
+log_when = os.environ.get("TRADEBOT_LOG_WHEN") or None
+
+# "json" writes one JSON object per line, "text" the classic one-line format
+log_format = os.environ.get("TRADEBOT_LOG_FORMAT", "json")
+
+# Level of the root logger and of each subsystem logger;
+# TRADEBOT_LOG_LEVELS="recognition=DEBUG,waits=WARNING" overrides them
+log_level = "INFO"
+subsystem_levels = {
+    "recognition": "INFO",
+    "waits": "INFO",
+    "trade": "INFO",
+    "prices": "INFO",
+}
+
+# Records allowed per call site and window before the rest are dropped (errors and above are never dropped)
+rate_limit = 5
+rate_window = 10.0
+
+text_format = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Logger of one subsystem, e.g. subsystem("recognition")
+def subsystem(name):
+    return logging.getLogger(f"tradebot.{name}")
+
+# One JSON object per record
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+# Drops records beyond rate_limit per call site and window; the next record let through carries the dropped count
+class RateLimitFilter(logging.Filter):
+    def __init__(self, limit=rate_limit, window=rate_window):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site is not None else 0
+                self.sites[key] = [now, 1, 0]
+            elif site[1] < self.limit:
+                site[1] += 1
+                suppressed = 0
+            else:
+                site[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+# Parse "recognition=DEBUG,waits=WARNING" into {"recognition": "DEBUG", "waits": "WARNING"}
+def parse_levels(text):
+    levels = {}
+    for part in filter(None, (part.strip() for part in text.split(','))):
+        name, _, level = part.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+_listener = None
+_listener_lock = threading.Lock()
+
+# Send every record through a queue to a background writer with rotation. Logging calls then only
+# format the message and enqueue it; file I/O happens on the listener thread. Safe to call more than once.
+def setup_logging(filename, level=log_level, levels=None, fmt=log_format):
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+        if log_when:
+            file_handler = TimedRotatingFileHandler(filename, when=log_when, backupCount=log_backups,
+                                                    encoding='utf-8', delay=True)
+        else:
+            file_handler = RotatingFileHandler(filename, maxBytes=log_max_bytes, backupCount=log_backups,
+                                               encoding='utf-8', delay=True)
+        file_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(text_format))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        configured = dict(subsystem_levels)
+        configured.update(levels or {})
+        configured.update(parse_levels(os.environ.get("TRADEBOT_LOG_LEVELS", "")))
+        for name, subsystem_level in configured.items():
+            try:
+                subsystem(name).setLevel(subsystem_level)
+            except ValueError:
+                print(f"Unknown log level {subsystem_level!r} for {name}")
+
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return _listener
+
+# Flush the queue and stop the writer thread
+def stop_logging():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+histogram_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Port of the local Prometheus endpoint (0 = off) and seconds between metrics file writes
+metrics_port = int(os.environ.get("TRADEBOT_METRICS_PORT", "0"))
+metrics_interval = 10
+
+# Prefix of every exported metric name
+metrics_prefix = "tradebot"
+
+# Duration histogram of one stage
+class Histogram:
+    def __init__(self, buckets=histogram_buckets):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    # Approximate quantile, interpolated inside the bucket it falls in
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+# In-memory stage timings and counters, exported as Prometheus text or a metrics file
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._server = None
+        self._writer = None
+        self._stop = threading.Event()
+
+    # Record one duration (seconds) of a stage
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # with metrics.timer("capture"): ...
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # Decorator form of timer
+    def timed(self, stage):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # {"stages": {stage: {count, total, mean, p50, p95, max}}, "counters": {...}}, times in seconds
+    def snapshot(self):
+        with self._lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                stages[stage] = {
+                    "count": histogram.count,
+                    "total": histogram.sum,
+                    "mean": histogram.sum / histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "max": histogram.max,
+                }
+            return {"uptime": time.time() - self.started, "stages": stages, "counters": dict(self.counters)}
+
+    # Prometheus text exposition format
+    def prometheus_text(self):
+        lines = [f"# TYPE {metrics_prefix}_stage_seconds histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metrics_prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metrics_prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metrics_prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{metrics_prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            lines.append(f"# TYPE {metrics_prefix}_events_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{metrics_prefix}_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    # Write the metrics to a file (JSON for *.json, Prometheus text otherwise), replacing it atomically
+    def write_file(self, path):
+        text = json.dumps(self.snapshot(), indent=2) if path.endswith('.json') else self.prometheus_text()
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(text)
+        os.replace(tmp_file, path)
+
+    # Serve /metrics on localhost
+    def serve(self, port=metrics_port):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        logging.info(f"Serving metrics on http://127.0.0.1:{self._server.server_address[1]}/metrics")
+        return self._server
+
+    # Start the endpoint (when port is set) and a periodic file writer (when path is set)
+    def start_exporter(self, path=None, port=metrics_port, interval=metrics_interval):
+        if port and self._server is None:
+            try:
+                self.serve(port)
+            except OSError as e:
+                logging.error(f"Failed to serve metrics on port {port}: {str(e)}")
+        if path and self._writer is None:
+            self._stop.clear()
+            self._writer = threading.Thread(target=self._write_loop, args=(path, interval),
+                                            name="metrics-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self, path, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.write_file(path)
+            except Exception as e:
+                logging.error(f"Failed to write metrics to {path}: {str(e)}")
+
+    def stop_exporter(self):
+        self._stop.set()
+        self._writer = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+# Shared metrics registry
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+# Shortcuts on the shared registry
+def timer(stage):
+    return get_metrics().timer(stage)
+
+def timed(stage):
+    return get_metrics().timed(stage)
+
+def count(name, amount=1):
+    get_metrics().count(name, amount)
@@ -0,0 +1,98 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from price_service import PriceService
+
+# Price list page in the layout of the real site
+fixture_page = """<html><body>
+<div class="grid-item"><img src="/img/dino.png"><h2>Dino Egg</h2><span class="hc-value">12 HC</span></div>
+<div class="grid-item"><img src="/img/cola.png"><h2>Cola Machine</h2><span class="hc-value">8 HC</span></div>
+<div class="grid-item"><img src="/img/throne.png"><h2>Throne</h2><span class="hc-value">1,500 HC</span></div>
+</body></html>"""
+fixture_items = [
+    ("Dino Egg", "12 HC", "/img/dino.png"),
+    ("Cola Machine", "8 HC", "/img/cola.png"),
+    ("Throne", "1,500 HC", "/img/throne.png"),
+]
+fixture_etag = '"prices-1"'
+
+# Serves the fixture page with an ETag and answers a matching If-None-Match with 304
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == fixture_etag:
+            self.requests_seen.append(304)
+            self.send_response(304)
+            self.send_header("ETag", fixture_etag)
+            self.end_headers()
+            return
+        body = fixture_page.encode()
+        self.requests_seen.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", fixture_etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# Fetch from a local fixture server, then revalidate from a fresh service; returns a list of failures
+def check_price_service():
+    failures = []
+
+    def check(what, got, wanted):
+        if got != wanted:
+            failures.append(f"{what} is {got}, expected {wanted}")
+
+    FixtureHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, "price_cache.json")
+
+            # First fetch: full page, parsed and written to the cache
+            check("parsed items", PriceService(url, cache_file, ttl=0).get_prices(), fixture_items)
+            check("responses after first fetch", FixtureHandler.requests_seen, [200])
+            try:
+                with open(cache_file, 'r') as f:
+                    cache = json.load(f)
+                check("cached items", [tuple(item) for item in cache["items"]], fixture_items)
+                check("cached etag", cache["etag"], fixture_etag)
+            except Exception as e:
+                failures.append(f"cache file not written: {str(e)}")
+
+            # A new service starts from the cache file and revalidates it; the 304 keeps the cached items
+            check("items after 304", PriceService(url, cache_file, ttl=0).get_prices(), fixture_items)
+            check("responses after revalidation", FixtureHandler.requests_seen, [200, 304])
+
+            # Within the TTL the cache is served without asking the site
+            check("items within ttl", PriceService(url, cache_file).get_prices(), fixture_items)
+            check("responses within ttl", FixtureHandler.requests_seen, [200, 304])
+    finally:
+        server.shutdown()
+        server.server_close()
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the price service against a local fixture server.")
+    parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    failures = check_price_service()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(failures)} failures")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
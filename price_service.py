@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+import traceback
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from log_setup import subsystem
+
+log = subsystem("prices")
+
+# Price list page (TRADEBOT_PRICE_URL points it at e.g. a local fixture server)
+price_url = os.environ.get("TRADEBOT_PRICE_URL", "https://originvalues.com/")
+
+# On-disk cache of the last fetched price list
+price_cache_file = r"price_cache.json"
+
+# Seconds a cached price list is served before it is revalidated
+price_ttl = 15 * 60
+
+# Seconds to wait for the price site
+request_timeout = 10
+
+# Seconds before retrying after a failed refresh
+retry_delay = 60
+
+# Parse (name, price, image_url) tuples out of the price list page
+def parse_prices(html):
+    soup = BeautifulSoup(html, "html.parser")
+    items = []
+    item_containers = soup.find_all(class_="grid-item")
+    for container in item_containers:
+        try:
+            name = container.find("h2").get_text(strip=True)
+            price = container.find("span", class_="hc-value").get_text(strip=True)
+            image_url = container.find("img")["src"]
+            items.append((name, price, image_url))
+        except Exception as e:
+            log.error(f"Error parsing item container: {str(e)}")
+            log.error(traceback.format_exc())
+    return items
+
+# Cached price list with conditional revalidation and an optional background refresher
+class PriceService:
+    def __init__(self, url=price_url, cache_file=price_cache_file, ttl=price_ttl):
+        self.url = url
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.items = []
+        self.fetched_at = 0
+        self.etag = None
+        self.last_modified = None
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._refresh_now = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.load_cache()
+
+    # Read the on-disk cache, if there is one
+    def load_cache(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache.get("url") != self.url:
+                return
+            self.items = [tuple(item) for item in cache.get("items", [])]
+            self.fetched_at = cache.get("fetched_at", 0)
+            self.etag = cache.get("etag")
+            self.last_modified = cache.get("last_modified")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.error(f"Failed to read price cache {self.cache_file}: {str(e)}")
+
+    def _save_cache(self):
+        cache = {
+            "url": self.url,
+            "items": self.items,
+            "fetched_at": self.fetched_at,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+        }
+        tmp_file = self.cache_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, self.cache_file)
+
+    # Whether the cached list is older than the TTL
+    def is_stale(self):
+        return time.time() - self.fetched_at > self.ttl
+
+    # Revalidate with the site (conditional GET) and return the current price list
+    def refresh(self):
+        headers = {}
+        if self.items and self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.items and self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        with self._lock:
+            response = self.session.get(self.url, headers=headers, timeout=request_timeout)
+            if response.status_code == 304:
+                log.info("Prices not modified since last fetch.")
+            else:
+                response.raise_for_status()
+                self.items = parse_prices(response.content)
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+                log.info(f"Fetched {len(self.items)} prices.")
+            self.fetched_at = time.time()
+            try:
+                self._save_cache()
+            except Exception as e:
+                log.error(f"Failed to write price cache {self.cache_file}: {str(e)}")
+            items = list(self.items)
+        self._notify(items)
+        return items
+
+    # Price list, fetching only when the cache is missing or stale
+    def get_prices(self):
+        if self.items and not self.is_stale():
+            return list(self.items)
+        try:
+            return self.refresh()
+        except Exception as e:
+            log.error(f"Failed to fetch prices: {str(e)}")
+            return list(self.items)
+
+    # Call listener(items) from the refresher thread whenever prices are refreshed
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, items):
+        for listener in list(self.listeners):
+            try:
+                listener(items)
+            except Exception as e:
+                log.error(f"Price listener failed: {str(e)}")
+
+    # Ask the refresher thread to revalidate now instead of waiting for the TTL
+    def request_refresh(self):
+        self.start()
+        self._refresh_now.set()
+
+    # Start the background refresher (serves the cache first, then refreshes every TTL)
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="price-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._refresh_now.set()
+        self._thread = None
+
+    def _run(self):
+        if self.items:
+            self._notify(list(self.items))
+        while not self._stop.is_set():
+            wait = max(1, self.ttl - (time.time() - self.fetched_at))
+            if self.is_stale() or self._refresh_now.is_set():
+                self._refresh_now.clear()
+                try:
+                    self.refresh()
+                    wait = self.ttl
+                except Exception as e:
+                    log.error(f"Failed to refresh prices: {str(e)}")
+                    self._notify(list(self.items))
+                    wait = retry_delay
+            self._refresh_now.wait(max(wait, 1))
+
+_service = None
+_service_lock = threading.Lock()
+
+# Shared price service
+def get_price_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PriceService()
+    return _service
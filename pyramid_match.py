@@ -0,0 +1,79 @@
+import cv2
+from frame_pool import get_frame_pool
+from inventory_scan import find_peaks
+
+# Templates are not shrunk below this many pixels on their shorter side
+min_template_side = 16
+
+# Most halvings applied; low-detail templates such as my_item_box stop matching beyond two
+max_pyramid_levels = 2
+
+# Coarse candidates scoring more than this below the best coarse score are not refined
+coarse_slack = 0.25
+
+# Number of coarse candidates re-checked at full resolution
+top_candidates = 5
+
+# Extra full-resolution pixels searched around each coarse candidate
+refine_margin = 4
+
+# Number of halvings that keep the template at least min_template_side pixels wide and high
+def pyramid_levels(template_shape, max_levels=max_pyramid_levels):
+    levels = 0
+    side = min(template_shape[:2])
+    while levels < max_levels and side // 2 >= min_template_side:
+        side //= 2
+        levels += 1
+    return levels
+
+# Halve an image `levels` times; with a tag the levels go into pooled buffers (see frame_pool)
+def downscale(image, levels, tag=None):
+    for level in range(levels):
+        image = cv2.pyrDown(image) if tag is None else get_frame_pool().pyr_down(image, f"{tag}_{level + 1}")
+    return image
+
+# Best TM_CCOEFF_NORMED match of template in screen as (score, (x, y)); the coarse pass runs on
+# downscaled grayscale copies and only the top candidates are scored at full resolution, so the
+# score is directly comparable with locateOnScreen's confidence. With min_score, a coarse best more
+# than coarse_slack below it returns (coarse score, None) without refining: nothing can reach it.
+def pyramid_match(screen, template, levels=None, top_k=top_candidates, min_score=None):
+    th, tw = template.shape[:2]
+    sh, sw = screen.shape[:2]
+    if sh < th or sw < tw:
+        return -1.0, None
+    if levels is None:
+        levels = pyramid_levels(template.shape)
+    if levels == 0:
+        result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, max_loc
+
+    template_gray = template if template.ndim == 2 else cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    screen_small = downscale(get_frame_pool().gray(screen, "pyramid_0"), levels, "pyramid")
+    template_small = downscale(template_gray, levels)
+    if screen_small.shape[0] < template_small.shape[0] or screen_small.shape[1] < template_small.shape[1]:
+        return -1.0, None
+    coarse = cv2.matchTemplate(screen_small, template_small, cv2.TM_CCOEFF_NORMED)
+    if min_score is not None and float(coarse.max()) < min_score - coarse_slack:
+        return float(coarse.max()), None
+
+    # Strongest well-separated coarse peaks
+    separation = max(2, min(template_small.shape[:2]) // 2)
+    peaks = find_peaks(coarse, threshold=float(coarse.max()) - coarse_slack, min_distance=separation)
+    peaks.sort(key=lambda point: -coarse[point[1], point[0]])
+
+    scale = 2 ** levels
+    best_score, best_loc = -1.0, None
+    for cx, cy in peaks[:top_k]:
+        x0 = max(cx * scale - scale - refine_margin, 0)
+        y0 = max(cy * scale - scale - refine_margin, 0)
+        x1 = min(cx * scale + scale + refine_margin + tw, sw)
+        y1 = min(cy * scale + scale + refine_margin + th, sh)
+        roi = screen[y0:y1, x0:x1]
+        if roi.shape[0] < th or roi.shape[1] < tw:
+            continue
+        result = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val > best_score:
+            best_score, best_loc = max_val, (x0 + max_loc[0], y0 + max_loc[1])
+    return best_score, best_loc
@@ -0,0 +1,84 @@
+import threading
+import zlib
+from collections import OrderedDict
+from metrics import count
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Distinct slot crops remembered per cache
+cache_size = 512
+
+# Fast fingerprint of an image's pixels and shape (xxh3 when xxhash is installed, crc32 otherwise)
+def fingerprint(image):
+    data = image.tobytes()
+    digest = xxhash.xxh3_64_intdigest(data) if xxhash is not None else zlib.crc32(data)
+    return image.shape, digest
+
+# Bounded LRU from (namespace, crop fingerprint) to a recognition result
+class RecognitionCache:
+    def __init__(self, maxsize=cache_size, name="slot"):
+        self.maxsize = maxsize
+        self.name = name
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # Cache key of a crop; namespace separates crops read with different templates (e.g. id of the templates dict)
+    def key(self, namespace, crop):
+        return namespace, fingerprint(crop)
+
+    # (True, result) for a known key, (False, None) otherwise
+    def get(self, key):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                hit, result = True, self.entries[key]
+            else:
+                self.misses += 1
+                hit, result = False, None
+        count(f"{self.name}_cache_{'hit' if hit else 'miss'}")
+        return hit, result
+
+    def put(self, key, result):
+        with self._lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    # Cached result for a crop, or compute(crop) stored under it
+    def lookup(self, namespace, crop, compute):
+        key = self.key(namespace, crop)
+        hit, result = self.get(key)
+        if not hit:
+            result = compute(crop)
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    # {"hits", "misses", "size", "hit_rate"}
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries),
+                    "hit_rate": self.hits / total if total else 0.0}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Shared cache for trade slot crops
+def get_recognition_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RecognitionCache()
+    return _cache
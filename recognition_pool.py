@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import BaseManager
+from inventory_grid import grid_scan
+
+# Worker processes shared by every bot instance of a supervisor. The pool only runs the full-sweep
+# inventory scan; slot reads, anchor searches and the default grid scan stay in the bot processes,
+# where they cost less than a round trip to the pool, so with the grid scan on there is no pool.
+pool_workers = 0 if grid_scan else max(1, (os.cpu_count() or 2) - 1)
+
+# host:port and hex auth key of a supervisor's recognition service (set for the bot processes it starts)
+recognition_address = os.environ.get("TRADEBOT_RECOGNITION_ADDRESS", "")
+recognition_key = os.environ.get("TRADEBOT_RECOGNITION_KEY", "")
+
+# Pool worker setup: serve templates from the supervisor's shared memory block
+def _init_worker(shm_name):
+    from shared_templates import attach_templates
+    from template_bank import TemplateBank, set_template_bank
+    set_template_bank(TemplateBank(shared=attach_templates(shm_name)))
+
+def _scan(screenshot_gray, items, origin, threshold):
+    from inventory_scan import scan_items
+    from template_bank import get_template_bank
+    bank = get_template_bank()
+    templates = {item: bank.items_inventory[item] for item in items if item in bank.items_inventory}
+    return scan_items(screenshot_gray, templates, origin, threshold)
+
+# Recognition jobs run on a process pool whose workers share one template block
+class RecognitionService:
+    def __init__(self, shm_name, workers=pool_workers):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shm_name,))
+
+    # Same result as inventory_scan.scan_items for the named inventory items
+    def scan(self, screenshot_gray, items, origin, threshold):
+        return self.executor.submit(_scan, screenshot_gray, list(items), tuple(origin), threshold).result()
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+class RecognitionManager(BaseManager):
+    pass
+
+# Serve a RecognitionService to other processes; returns (server, (host, port))
+def serve_recognition(service, authkey, address=("127.0.0.1", 0)):
+    RecognitionManager.register("recognition", callable=lambda: service)
+    server = RecognitionManager(address=address, authkey=authkey).get_server()
+    threading.Thread(target=server.serve_forever, name="recognition-server", daemon=True).start()
+    logging.info(f"Serving recognition on {server.address[0]}:{server.address[1]}")
+    return server, server.address
+
+_client = None
+_client_failed = False
+_client_lock = threading.Lock()
+
+# Proxy to the supervisor's recognition service, or None when this process runs on its own
+def get_recognition_client():
+    global _client, _client_failed
+    if _client is None and recognition_address and not _client_failed:
+        with _client_lock:
+            if _client is None and not _client_failed:
+                try:
+                    host, port = recognition_address.rsplit(':', 1)
+                    RecognitionManager.register("recognition")
+                    manager = RecognitionManager(address=(host, int(port)), authkey=bytes.fromhex(recognition_key))
+                    manager.connect()
+                    _client = manager.recognition()
+                except Exception as e:
+                    _client_failed = True
+                    logging.error(f"Failed to connect to recognition service {recognition_address}: {str(e)}")
+                    logging.error(traceback.format_exc())
+    return _client
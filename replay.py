@@ -0,0 +1,200 @@
+import argparse
+import cv2
+import json
+import logging
+import numpy as np
+import sys
+import time
+import tracemalloc
+from anchors import AnchorCache
+from inventory_scan import scan_inventory
+from recognition_cache import get_recognition_cache
+from item_counter import read_trade_counts, their_slot_coords, your_slot_coords
+from screen_source import FileScreenSource, SyntheticScreenSource, set_screen_source
+from slot_reader import BatchedSlotReader, trade_slot_regions
+from template_bank import get_template_bank, load_templates
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Labeled recorded frames
+default_manifest = r"replay_cases.json"
+
+# Inventory region of the recorded setup (TradeBot.inventory_coords)
+inventory_coords = (2029, 225, 288, 220)
+
+# Pixels an anchor may be off from its labeled position
+anchor_tolerance = 2
+
+# Saved inventory used to build synthetic frames, and the part of it that lines up with the inventory cells
+inventory_sample_path = r"images/Inventory_with_eggs.png"
+inventory_sample_crop = (207, 40, 288, 220)
+inventory_sample_counts = {"dino_egg": 6}
+
+# Durations per recognition stage
+class StageTimings:
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, stage, func):
+        start = time.perf_counter()
+        result = func()
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    # {stage: {"count", "p50", "p95", "fps"}}, times in milliseconds
+    def report(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            samples = np.array(samples)
+            report[stage] = {
+                "count": len(samples),
+                "p50": float(np.percentile(samples, 50)) * 1000,
+                "p95": float(np.percentile(samples, 95)) * 1000,
+                "fps": len(samples) / samples.sum() if samples.sum() > 0 else float('inf'),
+            }
+        return report
+
+# Load the labeled cases of a manifest: [{"name", "frame", "expect": {...}}]
+def load_manifest(path):
+    with open(path, 'r') as f:
+        cases = json.load(f)
+    for case in cases:
+        case.setdefault("name", case["frame"])
+    return cases
+
+# Random frames with digits, inventory items and buttons pasted at known places
+def synthetic_cases(count, seed=0):
+    rng = np.random.default_rng(seed)
+    bank = get_template_bank()
+    sample = cv2.imread(inventory_sample_path, cv2.IMREAD_COLOR)
+    cases = []
+    for index in range(count):
+        source = SyntheticScreenSource(2560, 1080, (200, 200, 200))
+        expect = {}
+
+        your_count, their_count = (int(value) for value in rng.integers(1, 10, 2))
+        source.paste(bank.digits_me[f'Me_{your_count}'], *your_slot_coords[:2])
+        source.paste(bank.digits_other[f'Other_{their_count}'], *their_slot_coords[:2])
+        expect["your_item_count"] = your_count
+        expect["their_item_count"] = their_count
+
+        slots = []
+        for slot, (x, y, w, h) in enumerate(trade_slot_regions):
+            # The first slot of each side is the one the trade counts are read from
+            value = {0: their_count, 6: your_count}.get(slot) or int(rng.integers(1, 10))
+            digit = bank.digits_other[f'Other_{value}'] if slot < 6 else bank.digits_me[f'Me_{value}']
+            source.paste(digit, x + int(rng.integers(0, w - digit.shape[1] + 1)), y)
+            slots.append(value)
+        expect["trade_slots"] = slots
+
+        if sample is not None:
+            x, y, w, h = inventory_sample_crop
+            source.paste(sample[y:y + h, x:x + w], *inventory_coords[:2])
+            expect["inventory"] = dict(inventory_sample_counts)
+
+        # The inventory sample already shows a next page arrow, so only the trade window buttons are placed
+        anchors = {}
+        for column, name in enumerate(("accept_button", "cancel_button", "my_item_box")):
+            template = bank.buttons_color.get(name)
+            if template is None:
+                continue
+            x = 1200 + column * 300 + int(rng.integers(0, 100))
+            # Below the trade slot labels and fully on screen
+            y = 640 + int(rng.integers(0, 1080 - 640 - template.shape[0] + 1))
+            source.paste(template, x, y)
+            anchors[name] = [x, y]
+        expect["anchors"] = anchors
+        cases.append({"name": f"synthetic_{index}", "source": source, "expect": expect})
+    return cases
+
+# Run every recognition stage on one case; returns a list of mismatch messages
+def run_case(case, timings, templates_me, templates_other):
+    source = case.get("source") or FileScreenSource(case["frame"])
+    set_screen_source(source)
+    expect = case.get("expect", {})
+    failures = []
+
+    def check(what, got, wanted):
+        if got != wanted:
+            failures.append(f"{case['name']}: {what} is {got}, expected {wanted}")
+
+    your_count, their_count = timings.measure("trade_counts", lambda: read_trade_counts(templates_me, templates_other))
+    if "your_item_count" in expect:
+        check("your_item_count", your_count, expect["your_item_count"])
+    if "their_item_count" in expect:
+        check("their_item_count", their_count, expect["their_item_count"])
+
+    reader = BatchedSlotReader(templates_me, templates_other)
+    slots = timings.measure("trade_slots", lambda: reader.read(reader.capture()))
+    if "trade_slots" in expect:
+        check("trade_slots", slots, expect["trade_slots"])
+
+    region = tuple(case.get("inventory_coords", inventory_coords))
+    counts, _ = timings.measure("inventory", lambda: scan_inventory(region, source=source))
+    for item, wanted in expect.get("inventory", {}).items():
+        check(f"inventory {item}", counts.get(item, (0, []))[0], wanted)
+
+    cache = AnchorCache(source)
+    for name, wanted in expect.get("anchors", {}).items():
+        for stage in ("anchor_search", "anchor_cached"):
+            box = timings.measure(stage, lambda: cache.locate(name))
+            if wanted is None:
+                if box is not None:
+                    failures.append(f"{case['name']}: {name} found at {box[:2]}, expected none")
+            elif box is None:
+                failures.append(f"{case['name']}: {name} not found, expected at {wanted}")
+            elif abs(box.left - wanted[0]) > anchor_tolerance or abs(box.top - wanted[1]) > anchor_tolerance:
+                failures.append(f"{case['name']}: {name} at {box[:2]}, expected {wanted}")
+    return failures
+
+# Replay cases `repeat` times and return (stage report, failures, memory)
+def replay(cases, repeat=1):
+    templates_me, templates_other = load_templates()
+    timings = StageTimings()
+    failures = []
+    tracemalloc.start()
+    frames = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for case in cases:
+            failures.extend(run_case(case, timings, templates_me, templates_other))
+            frames += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory = {"traced_peak_mb": peak / 1e6}
+    if resource is not None:
+        memory["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    memory["frames_per_second"] = frames / elapsed if elapsed > 0 else float('inf')
+    return timings.report(), failures, memory
+
+def print_report(report, failures, memory):
+    for stage, stats in report.items():
+        print(f"{stage:15s} n={stats['count']:4d}  p50 {stats['p50']:8.2f} ms  p95 {stats['p95']:8.2f} ms  "
+              f"{stats['fps']:8.1f}/s")
+    print("  ".join(f"{key} {value:.1f}" for key, value in memory.items()))
+    cache = get_recognition_cache().stats()
+    print(f"slot cache hits {cache['hits']}  misses {cache['misses']}  hit rate {cache['hit_rate']:.0%}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"{len(failures)} mismatches")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic frames through the recognition pipeline.")
+    parser.add_argument("manifest", nargs="?", default=default_manifest, help="JSON list of labeled frames")
+    parser.add_argument("--synthetic", type=int, default=0, help="also run this many synthetic frames")
+    parser.add_argument("--repeat", type=int, default=1, help="replay every case this many times")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    cases = load_manifest(args.manifest) if args.manifest else []
+    cases += synthetic_cases(args.synthetic)
+    report, failures, memory = replay(cases, args.repeat)
+    print_report(report, failures, memory)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import cv2
+import numpy as np
+import logging
+import os
+import threading
+from frame_pool import get_frame_pool
+from metrics import timed
+
+try:
+    import mss
+except ImportError:
+    mss = None
+
+# Bounding box (x, y, w, h) covering every region
+def union_region(regions):
+    x0 = min(x for x, _, _, _ in regions)
+    y0 = min(y for _, y, _, _ in regions)
+    x1 = max(x + w for x, _, w, _ in regions)
+    y1 = max(y + h for _, y, _, h in regions)
+    return x0, y0, x1 - x0, y1 - y0
+
+# Express a screen region relative to the origin of a grabbed image
+def offset_region(region, origin):
+    x, y, w, h = region
+    return x - origin[0], y - origin[1], w, h
+
+# Base class for everything recognition reads pixels from.
+# Returned arrays may be reused by the next grab of the same size; copy them to keep them.
+class ScreenSource:
+    # Image of a screen region (x, y, w, h), or the whole screen for None, as BGR or grayscale
+    def grab(self, region=None, gray=False):
+        raise NotImplementedError
+
+    # One grab covering several regions; returns (image, (x, y) origin of the image on screen)
+    def grab_regions(self, regions, gray=False):
+        region = union_region(regions)
+        return self.grab(region, gray), region[:2]
+
+    # (width, height) of the screen
+    def size(self):
+        raise NotImplementedError
+
+# Live desktop capture through mss when installed, pyautogui otherwise
+class DesktopScreenSource(ScreenSource):
+    def __init__(self):
+        self._local = threading.local()
+
+    def _mss(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    @timed('screenshot')
+    def grab(self, region=None, gray=False):
+        if mss is not None:
+            sct = self._mss()
+            if region is None:
+                monitor = sct.monitors[1]
+            else:
+                monitor = {"left": region[0], "top": region[1], "width": region[2], "height": region[3]}
+            shot = sct.grab(monitor)
+            raw = np.frombuffer(shot.raw, np.uint8).reshape(shot.height, shot.width, 4)
+            code = cv2.COLOR_BGRA2GRAY if gray else cv2.COLOR_BGRA2BGR
+        else:
+            import pyautogui
+            shot = pyautogui.screenshot(region=region)
+            raw = np.asarray(shot)
+            code = cv2.COLOR_RGB2GRAY if gray else cv2.COLOR_RGB2BGR
+        # Converted straight into a reused buffer, so steady capture loops do not allocate frames
+        return get_frame_pool().convert(raw, code, "capture")
+
+    def size(self):
+        if mss is not None:
+            monitor = self._mss().monitors[1]
+            return monitor["width"], monitor["height"]
+        import pyautogui
+        return tuple(pyautogui.size())
+
+# Screen backed by a recorded frame, for running recognition headless
+class FileScreenSource(ScreenSource):
+    def __init__(self, frame):
+        if isinstance(frame, str):
+            path = frame
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise FileNotFoundError(f"Failed to load screen frame {path}")
+        self.frame = frame
+        self._gray = None
+
+    # Replace the current frame (e.g. the next recorded one)
+    def set_frame(self, frame):
+        self.frame = frame
+        self._gray = None
+
+    def grab(self, region=None, gray=False):
+        if gray:
+            if self._gray is None:
+                self._gray = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+            image = self._gray
+        else:
+            image = self.frame
+        if region is None:
+            return image
+        x, y, w, h = region
+        crop = image[max(y, 0):y + h, max(x, 0):x + w]
+        if crop.shape[:2] != (h, w):
+            raise ValueError(f"Region {region} lies outside the {image.shape[1]}x{image.shape[0]} frame")
+        return crop
+
+    def size(self):
+        return self.frame.shape[1], self.frame.shape[0]
+
+# Blank screen that templates can be pasted onto, for tests and benchmarks
+class SyntheticScreenSource(FileScreenSource):
+    def __init__(self, width, height, color=(0, 0, 0)):
+        super().__init__(np.full((height, width, 3), color, np.uint8))
+
+    # Paste a BGR or grayscale image with its top-left corner at (x, y)
+    def paste(self, image, x, y):
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        self.frame[y:y + image.shape[0], x:x + image.shape[1]] = image[:, :, :3]
+        self._gray = None
+
+_source = None
+_source_lock = threading.Lock()
+
+# Source used by every recognition path; TRADEBOT_SCREEN_SOURCE=<image file> replays a recorded frame
+def get_screen_source():
+    global _source
+    if _source is None:
+        with _source_lock:
+            if _source is None:
+                frame_path = os.environ.get("TRADEBOT_SCREEN_SOURCE")
+                if frame_path:
+                    logging.info(f"Reading the screen from {frame_path}")
+                    _source = FileScreenSource(frame_path)
+                else:
+                    _source = DesktopScreenSource()
+    return _source
+
+# Swap the screen source (e.g. a FileScreenSource in tests)
+def set_screen_source(source):
+    global _source
+    _source = source
@@ -0,0 +1,61 @@
+import json
+import logging
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+# Layout of a block: 8-byte index length, JSON index {key: [[offset, shape], [offset, shape]]}, then the pixels
+header_size = 8
+alignment = 64
+
+# Memory blocks this process has attached to, kept open for as long as their arrays are in use
+_attached = {}
+
+def _aligned(offset):
+    return (offset + alignment - 1) // alignment * alignment
+
+# Copy {key: (color, gray)} templates (see TemplateBank.entries) into a new shared memory block
+def publish_templates(entries, name=None):
+    index = {}
+    offset = 0
+    for key, images in entries.items():
+        index[key] = []
+        for image in images:
+            index[key].append([offset, list(image.shape)])
+            offset = _aligned(offset + image.nbytes)
+    index_bytes = json.dumps(index).encode()
+    data_start = _aligned(header_size + len(index_bytes))
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(data_start + offset, 1))
+    shm.buf[:header_size] = len(index_bytes).to_bytes(header_size, 'little')
+    shm.buf[header_size:header_size + len(index_bytes)] = index_bytes
+    for key, images in entries.items():
+        for (image_offset, shape), image in zip(index[key], images):
+            view = np.ndarray(shape, np.uint8, buffer=shm.buf, offset=data_start + image_offset)
+            view[...] = image
+    logging.info(f"Published {len(entries)} templates ({data_start + offset} bytes) as {shm.name}")
+    return shm
+
+# Map the templates of a published block as read-only arrays: {key: (color, gray)}.
+# track=False keeps this process's resource tracker from unlinking the block when the process exits,
+# which is what separately started bot processes want; the publisher owns and unlinks it.
+def attach_templates(name, track=True):
+    shm = _attached.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        if not track:
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        _attached[name] = shm
+    index_length = int.from_bytes(bytes(shm.buf[:header_size]), 'little')
+    index = json.loads(bytes(shm.buf[header_size:header_size + index_length]))
+    data_start = _aligned(header_size + index_length)
+    entries = {}
+    for key, images in index.items():
+        arrays = []
+        for image_offset, shape in images:
+            array = np.ndarray(shape, np.uint8, buffer=shm.buf, offset=data_start + image_offset)
+            array.flags.writeable = False
+            arrays.append(array)
+        entries[key] = tuple(arrays)
+    return entries
@@ -0,0 +1,137 @@
+import numpy as np
+import logging
+from item_counter import ambiguous_score, report_ambiguous_slot
+from recognition_cache import get_recognition_cache
+from screen_source import get_screen_source, union_region
+
+# Count labels of the 12 trade window slots: the other player's six, then my six. Measured on the
+# reference setup (images/fewfewfew.PNG): the label sits above its slot, slots are 84 pixels apart
+# and the second row is 108 pixels below the first.
+trade_slot_regions = [
+    (1306, 498, 21, 20),
+    (1390, 498, 21, 20),
+    (1474, 498, 21, 20),
+    (1306, 606, 21, 20),
+    (1390, 606, 21, 20),
+    (1474, 606, 21, 20),
+    (1640, 497, 21, 20),
+    (1724, 497, 21, 20),
+    (1808, 497, 21, 20),
+    (1640, 605, 21, 20),
+    (1724, 605, 21, 20),
+    (1808, 605, 21, 20)
+]
+
+# Zero-mean, unit-norm rows so a dot product equals TM_CCOEFF_NORMED
+def _normalize_rows(rows):
+    rows = rows - rows.mean(axis=1, keepdims=True)
+    norms = np.sqrt((rows * rows).sum(axis=1, keepdims=True))
+    valid = norms[:, 0] > 1e-6
+    rows = np.divide(rows, norms, out=np.zeros_like(rows), where=norms > 1e-6)
+    return rows, valid
+
+# Digit templates of one trade side stacked into matrices, one per template size
+class DigitMatrix:
+    def __init__(self, templates):
+        self.groups = []
+        by_shape = {}
+        for label, template in templates.items():
+            by_shape.setdefault(template.shape, []).append((label, template))
+        for shape, entries in by_shape.items():
+            labels = [label for label, _ in entries]
+            rows = np.stack([template.reshape(-1) for _, template in entries]).astype(np.float32)
+            matrix, _ = _normalize_rows(rows)
+            self.groups.append((shape, labels, matrix))
+
+    # Best label and score for each crop in a (n, h, w) grayscale stack
+    def classify(self, crops):
+        count = crops.shape[0]
+        best_labels = [None] * count
+        # A flat crop (an empty slot) correlates with nothing and keeps no label
+        best_scores = np.zeros(count, dtype=np.float32)
+        for (th, tw), labels, matrix in self.groups:
+            if crops.shape[1] < th or crops.shape[2] < tw:
+                logging.debug(f"Templates {labels} are larger than the slot region.")
+                continue
+            windows = np.lib.stride_tricks.sliding_window_view(crops, (th, tw), axis=(1, 2))
+            positions = windows.shape[1] * windows.shape[2]
+            rows, valid = _normalize_rows(windows.reshape(count * positions, th * tw).astype(np.float32))
+            scores = rows @ matrix.T
+            scores[~valid] = 0
+            scores = scores.reshape(count, positions, len(labels)).max(axis=1)
+            group_best = scores.argmax(axis=1)
+            group_scores = scores[np.arange(count), group_best]
+            for i in np.nonzero(group_scores > best_scores)[0]:
+                best_scores[i] = group_scores[i]
+                best_labels[i] = labels[group_best[i]]
+        return best_labels, best_scores
+
+# Reads every trade slot count from a single capture
+class BatchedSlotReader:
+    def __init__(self, templates_me, templates_other, regions=None):
+        self.set_regions(trade_slot_regions if regions is None else regions)
+        self.matrix_other = DigitMatrix(templates_other)
+        self.matrix_me = DigitMatrix(templates_me)
+        # Cache namespaces, shared with read_number_from_trade_slot for the same template sets
+        self.namespace_other = id(templates_other)
+        self.namespace_me = id(templates_me)
+
+    # Move the slots (e.g. after the trade window moved)
+    def set_regions(self, regions):
+        self.regions = list(regions)
+        self.bbox = union_region(self.regions)
+
+    # Capture the bounding box of all slots as grayscale
+    def capture(self):
+        return get_screen_source().grab(self.bbox, gray=True)
+
+    # Slot crops as views into the bounding-box capture
+    def slot_views(self, gray, origin=None):
+        ox, oy = origin if origin is not None else self.bbox[:2]
+        return [gray[y - oy:y - oy + h, x - ox:x - ox + w] for x, y, w, h in self.regions]
+
+    # Recognize all slots of an already captured grayscale bounding box; only crops the
+    # recognition cache has not seen before are classified
+    def read(self, gray, origin=None):
+        views = self.slot_views(gray, origin)
+        half = len(views) // 2
+        cache = get_recognition_cache()
+        counts = []
+        for matrix, namespace, side in ((self.matrix_other, self.namespace_other, views[:half]),
+                                        (self.matrix_me, self.namespace_me, views[half:])):
+            keys = [cache.key(namespace, view) for view in side]
+            side_counts = []
+            unseen = []
+            for index, key in enumerate(keys):
+                hit, value = cache.get(key)
+                side_counts.append(value)
+                if not hit:
+                    unseen.append(index)
+            if unseen:
+                labels, scores = matrix.classify(np.stack([side[index] for index in unseen]))
+                for index, label, score in zip(unseen, labels, scores):
+                    value = 0 if label is None or label == 'Empty' else int(label.split('_')[-1])
+                    if value and score < ambiguous_score:
+                        report_ambiguous_slot(f"trade_slot_{len(counts) + index}", side[index], label, score)
+                    side_counts[index] = value
+                    cache.put(keys[index], value)
+            counts.extend(side_counts)
+        return counts
+
+_readers = {}
+
+# Shared reader for a pair of template sets
+def get_slot_reader(templates_me, templates_other):
+    key = (id(templates_me), id(templates_other))
+    entry = _readers.get(key)
+    if entry is None:
+        entry = (templates_me, templates_other, BatchedSlotReader(templates_me, templates_other))
+        _readers[key] = entry
+    return entry[2]
+
+# Move the trade slots for new and existing shared readers
+def set_trade_slot_regions(regions):
+    global trade_slot_regions
+    trade_slot_regions = list(regions)
+    for _, _, reader in list(_readers.values()):
+        reader.set_regions(trade_slot_regions)
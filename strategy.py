@@ -0,0 +1,235 @@
+import logging
+import re
+import numpy as np
+from template_bank import item_templates
+
+# Largest number of items on one side of a trade (the GUI caps counts at 99)
+max_bundle = 99
+
+# Fair rates multiply to exactly 1 around any cycle, so profit can only come from whole-item rounding.
+# A counterparty is assumed to accept a bundle rounded up in our favour while it is worth at most this
+# fraction more than fair (e.g. 17 for 7 at a fair 2.4 is 1.2% over); otherwise the amount is rounded down.
+rounding_tolerance = 0.02
+
+# Cycles gaining less than this fraction are ignored
+min_profit = 0.01
+
+# Upper-case name used in trade messages, e.g. "DINO EGG"
+def display_name(item):
+    return item.replace('_', ' ').upper()
+
+# Parse a scraped price such as "12", "1,500" or "0.5 HC" into a float (None if there is no number)
+def parse_price(text):
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", str(text))
+    if match is None:
+        return None
+    return float(match.group(0).replace(',', ''))
+
+def _compact(text):
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+# Map fetch_prices results onto item keys: {item: price}
+def prices_for_items(fetched, items=None):
+    items = list(item_templates) if items is None else list(items)
+    prices = {}
+    for name, price, _ in fetched:
+        compact_name = _compact(name)
+        name_tokens = set(re.findall(r"[a-z0-9]+", name.lower()))
+        for item in items:
+            tokens = item.split('_')
+            if _compact(item) == compact_name or all(token in name_tokens for token in tokens):
+                value = parse_price(price)
+                if value and item not in prices:
+                    prices[item] = value
+    return prices
+
+# Items obtainable for give items at a fair rate: rounded up in our favour while that stays within the
+# tolerance, otherwise rounded down
+def obtainable(give, fair, tolerance=rounding_tolerance):
+    exact = np.asarray(give, dtype=np.float64) * fair
+    up = np.ceil(exact - 1e-9)
+    return np.where(up <= exact * (1 + tolerance) + 1e-9, up, np.floor(exact + 1e-9))
+
+# Best obtainable rate over bundles of up to max_bundle items on both sides, for every fair rate. Each edge
+# is rated on its own, so this only bounds what a chain of trades can get (see StrategyEngine.chain).
+def bundle_rates(fair, max_bundle=max_bundle, tolerance=rounding_tolerance):
+    fair = np.asarray(fair, dtype=np.float64)
+    give = np.arange(1, max_bundle + 1, dtype=np.float64)
+    get = np.minimum(obtainable(give, fair[..., None], tolerance), max_bundle)
+    return (get / give).max(axis=-1)
+
+# Exchange-rate graph over tracked items, with negative-cycle search on -log(rate)
+class StrategyEngine:
+    def __init__(self, tolerance=rounding_tolerance, max_bundle=max_bundle, min_profit=min_profit):
+        self.tolerance = tolerance
+        self.max_bundle = max_bundle
+        self.min_profit = min_profit
+        self.items = []
+        self.index = {}
+        self.prices = np.zeros(0)
+        self.rates = np.zeros((0, 0))
+        self.cycles = []
+
+    def _grow(self, new_items):
+        for item in new_items:
+            self.index[item] = len(self.items)
+            self.items.append(item)
+        size = len(self.items)
+        old = self.rates.shape[0]
+        rates = np.zeros((size, size))
+        rates[:old, :old] = self.rates
+        self.rates = rates
+        prices = np.full(size, np.nan)
+        prices[:old] = self.prices
+        self.prices = prices
+
+    # Recompute the rows and columns of the changed items only
+    def _update_edges(self, changed):
+        rows = np.array(changed)
+        others = np.setdiff1d(np.arange(len(self.items)), rows)
+        valid = ~np.isnan(self.prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out_fair = self.prices[rows, None] / self.prices[None, :]
+            in_fair = self.prices[others, None] / self.prices[None, rows]
+        for fair, index in ((out_fair, np.ix_(rows, np.arange(len(self.items)))), (in_fair, np.ix_(others, rows))):
+            if fair.size == 0:
+                continue
+            fair = np.where(np.isfinite(fair), fair, 0)
+            self.rates[index] = bundle_rates(fair, self.max_bundle, self.tolerance)
+        self.rates[~valid, :] = 0
+        self.rates[:, ~valid] = 0
+        np.fill_diagonal(self.rates, 0)
+
+    # Apply a {item: price} map; only items whose price changed are recomputed and searched
+    def update_prices(self, prices):
+        new_items = [item for item in prices if item not in self.index]
+        if new_items:
+            self._grow(new_items)
+        changed = [self.index[item] for item, price in prices.items()
+                   if not self.prices[self.index[item]] == price]
+        if not changed:
+            return self.cycles
+        for item, price in prices.items():
+            self.prices[self.index[item]] = price
+        self._update_edges(changed)
+
+        # Cycles avoiding every changed item keep their rates; anything new must pass through a changed item
+        changed_set = set(changed)
+        kept = [cycle for cycle in self.cycles if not changed_set.intersection(cycle[0])]
+        found = self.find_cycles(sources=changed)
+        self.cycles = self._dedupe(kept + found)
+        # Every trade adds its own rounding gain, so rank by the gain per trade rather than by the total
+        self.cycles.sort(key=lambda cycle: -cycle[1] ** (1 / len(cycle[0])))
+        return self.cycles
+
+    # Negative cycles of -log(rate) reachable from the sources (all items by default), as (nodes, profit)
+    def find_cycles(self, sources=None, limit=10):
+        size = len(self.items)
+        if size < 2:
+            return []
+        with np.errstate(divide='ignore'):
+            weights = np.where(self.rates > 0, -np.log(np.where(self.rates > 0, self.rates, 1)), np.inf)
+        sources = range(size) if sources is None else sources
+        cycles = []
+        blocked = np.zeros_like(weights, dtype=bool)
+        for _ in range(limit):
+            cycle = self._bellman_ford(np.where(blocked, np.inf, weights), sources)
+            if cycle is None:
+                break
+            profit = self.cycle_profit(cycle)
+            if profit - 1 >= self.min_profit:
+                cycles.append((cycle, profit))
+            # Block the weakest edge of the cycle so the next pass finds a different one
+            edges = list(zip(cycle, cycle[1:] + cycle[:1]))
+            weakest = min(edges, key=lambda edge: self.rates[edge])
+            blocked[weakest] = True
+        return cycles
+
+    # Multi-source Bellman-Ford over the dense weight matrix; returns one negative cycle or None
+    def _bellman_ford(self, weights, sources):
+        size = weights.shape[0]
+        dist = np.full(size, np.inf)
+        dist[list(sources)] = 0
+        pred = np.full(size, -1)
+        columns = np.arange(size)
+        for _ in range(size):
+            candidates = dist[:, None] + weights
+            best = candidates.argmin(axis=0)
+            best_dist = candidates[best, columns]
+            improved = best_dist < dist - 1e-12
+            if not improved.any():
+                return None
+            dist = np.where(improved, best_dist, dist)
+            pred = np.where(improved, best, pred)
+            # Any cycle in the predecessor graph is negative, so stop as soon as one appears
+            cycle = self._pred_cycle(pred)
+            if cycle is not None:
+                return cycle
+        return self._pred_cycle(pred)
+
+    # A cycle in the predecessor graph, in trade order, or None
+    def _pred_cycle(self, pred):
+        pred = pred.tolist()
+        state = [0] * len(pred)
+        for start in range(len(pred)):
+            path = []
+            node = start
+            while node != -1 and state[node] == 0:
+                state[node] = 1
+                path.append(node)
+                node = pred[node]
+            if node != -1 and state[node] == 1:
+                cycle = path[path.index(node):]
+                cycle.reverse()
+                return self._rotate(cycle)
+            for visited in path:
+                state[visited] = 2
+        return None
+
+    @staticmethod
+    def _rotate(cycle):
+        start = cycle.index(min(cycle))
+        return cycle[start:] + cycle[:start]
+
+    def _dedupe(self, cycles):
+        seen = set()
+        unique = []
+        for nodes, _ in cycles:
+            key = tuple(nodes)
+            if key not in seen:
+                seen.add(key)
+                unique.append((nodes, self.cycle_profit(nodes)))
+        return unique
+
+    # Executable amounts around a cycle: every trade gives everything the previous one got. Returns the
+    # amounts held before each trade plus the final one, starting from the best starting amount, or None
+    # when no start keeps every trade within max_bundle.
+    def chain(self, cycle):
+        start = np.arange(1, self.max_bundle + 1, dtype=np.float64)
+        amounts = [start]
+        for a, b in zip(cycle, cycle[1:] + cycle[:1]):
+            amounts.append(obtainable(amounts[-1], self.prices[a] / self.prices[b], self.tolerance))
+        amounts = np.stack(amounts)
+        valid = (amounts >= 1).all(axis=0) & (amounts <= self.max_bundle).all(axis=0)
+        if not valid.any():
+            return None
+        gain = np.where(valid, amounts[-1] / start, 0)
+        return [int(amount) for amount in amounts[:, gain.argmax()]]
+
+    # Value multiplier of going once around a cycle with executable amounts
+    def cycle_profit(self, cycle):
+        amounts = self.chain(cycle)
+        return amounts[-1] / amounts[0] if amounts else 0.0
+
+    # Trade messages for the best cycles, e.g. "SELL 17 DINO EGG -> BUY 26 COLA MACHINE -> SELL 26 COLA MACHINE -> ..."
+    def suggestions(self, limit=5):
+        lines = []
+        for cycle, profit in self.cycles[:limit]:
+            amounts = self.chain(cycle)
+            steps = []
+            for step, (a, b) in enumerate(zip(cycle, cycle[1:] + cycle[:1])):
+                steps.append(f"SELL {amounts[step]} {display_name(self.items[a])} -> "
+                             f"BUY {amounts[step + 1]} {display_name(self.items[b])}")
+            lines.append(f"{' -> '.join(steps)} (+{(profit - 1) * 100:.1f}%)")
+        logging.info(f"Strategy suggestions: {lines}")
+        return lines
@@ -0,0 +1,176 @@
+import argparse
+import json
+import logging
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from inventory_grid import grid_scan
+from log_setup import setup_logging
+from recognition_pool import RecognitionService, pool_workers, serve_recognition
+from shared_templates import publish_templates
+from template_bank import get_template_bank
+
+setup_logging('supervisor.log')
+
+# Instance list: [{"name", "sell": "dino_egg:1", "buy": "cola_machine:3", "display"?, "coords"?, "delay"?}]
+instances_file = r"instances.json"
+
+# Seconds before restarting a bot that exited, doubled after every quick exit up to the maximum
+restart_delay = 5
+max_restart_delay = 300
+
+# A bot that ran at least this long resets its restart delay
+stable_after = 60
+
+# Entry point started for every instance
+headless_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "headless.py")
+
+# One bot process and its restart bookkeeping
+class Instance:
+    def __init__(self, config):
+        self.name = config["name"]
+        self.config = config
+        self.process = None
+        self.started_at = 0
+        self.restart_at = 0
+        self.delay = restart_delay
+        self.restarts = 0
+
+    def command(self):
+        command = [sys.executable, headless_script, "run", "--sell", self.config["sell"], "--buy", self.config["buy"],
+                   "--instance", self.name, "--delay", str(self.config.get("delay", 0))]
+        if self.config.get("coords"):
+            command += ["--coords", json.dumps(self.config["coords"])]
+        if self.config.get("frame"):
+            command += ["--frame", self.config["frame"]]
+        return command
+
+# Runs every configured bot as its own process. Templates are published once in shared memory for all
+# bots. With the full-sweep inventory scan (TRADEBOT_GRID_SCAN=0) its matching also goes to one shared
+# process pool; every other recognition step runs in the bot processes (see recognition_pool.pool_workers).
+class Supervisor:
+    def __init__(self, instances, workers=pool_workers):
+        names = [config["name"] for config in instances]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Instance names must be unique: {names}")
+        self.instances = [Instance(config) for config in instances]
+        self.workers = workers
+        self.stop_event = threading.Event()
+        self.shm = None
+        self.service = None
+        self.server = None
+        self.env = {}
+
+    # Publish the templates and start the recognition service the bots connect to. The bots inherit
+    # TRADEBOT_GRID_SCAN; with the grid scan on they never send work to the pool, so it is not started.
+    def start_shared(self):
+        self.shm = publish_templates(get_template_bank().entries())
+        self.env = {"TRADEBOT_TEMPLATE_SHM": self.shm.name}
+        if grid_scan or self.workers < 1:
+            logging.info("Recognition pool not started: it only serves the full-sweep inventory scan "
+                         "(TRADEBOT_GRID_SCAN=0)")
+            return
+        self.service = RecognitionService(self.shm.name, self.workers)
+        authkey = secrets.token_bytes(16)
+        self.server, address = serve_recognition(self.service, authkey)
+        self.env.update({
+            "TRADEBOT_RECOGNITION_ADDRESS": f"{address[0]}:{address[1]}",
+            "TRADEBOT_RECOGNITION_KEY": authkey.hex(),
+        })
+
+    def spawn(self, instance):
+        env = os.environ.copy()
+        env.update(self.env)
+        if instance.config.get("display"):
+            env["DISPLAY"] = instance.config["display"]
+        instance.process = subprocess.Popen(instance.command(), env=env)
+        instance.started_at = time.monotonic()
+        logging.info(f"Started {instance.name} (pid {instance.process.pid})")
+        print(f"Started {instance.name} (pid {instance.process.pid})")
+
+    # Restart bots that exited, backing off when they keep failing
+    def poll(self):
+        now = time.monotonic()
+        for instance in self.instances:
+            if instance.process is None:
+                if now >= instance.restart_at:
+                    self.spawn(instance)
+                continue
+            code = instance.process.poll()
+            if code is None:
+                continue
+            ran = now - instance.started_at
+            instance.delay = restart_delay if ran >= stable_after else min(instance.delay * 2, max_restart_delay)
+            instance.restart_at = now + instance.delay
+            instance.restarts += 1
+            instance.process = None
+            logging.error(f"{instance.name} exited with {code} after {ran:.0f}s, restarting in {instance.delay}s")
+            print(f"{instance.name} exited with {code}, restarting in {instance.delay}s")
+
+    def run(self):
+        self.start_shared()
+        try:
+            while not self.stop_event.is_set():
+                self.poll()
+                self.stop_event.wait(1)
+        finally:
+            self.shutdown()
+
+    # Stop every bot, then the pool, then release the shared templates
+    def shutdown(self):
+        for instance in self.instances:
+            if instance.process is not None and instance.process.poll() is None:
+                instance.process.terminate()
+        for instance in self.instances:
+            if instance.process is not None:
+                try:
+                    instance.process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    instance.process.kill()
+        if self.service is not None:
+            self.service.shutdown()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+# Load the instance list
+def load_instances(path=instances_file):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several bot instances with shared templates "
+                                                 "and a shared full-sweep recognition pool.")
+    parser.add_argument("config", nargs="?", default=instances_file, help="JSON list of instances")
+    parser.add_argument("--workers", type=int, default=pool_workers,
+                        help="full-sweep recognition worker processes (default 0 while TRADEBOT_GRID_SCAN is on)")
+    args = parser.parse_args(argv)
+
+    try:
+        supervisor = Supervisor(load_instances(args.config), args.workers)
+    except Exception as e:
+        print(f"Failed to load {args.config}: {str(e)}")
+        return 1
+
+    def stop(signum, frame):
+        supervisor.stop_event.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        supervisor.run()
+        return 0
+    except Exception as e:
+        logging.critical(f"Supervisor terminated unexpectedly: {str(e)}")
+        logging.critical(traceback.format_exc())
+        print(f"Supervisor terminated unexpectedly: {str(e)}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
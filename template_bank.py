@@ -0,0 +1,214 @@
+import cv2
+import logging
+import os
+import threading
+
+# Directory holding all template images
+template_dir = r"images"
+
+# Path to the blank reference image
+blank_image_path = r"Blank.png"
+
+# Slot sizes (height, width) the blank reference is pre-sized for
+blank_shapes = [(20, 21), (60, 61)]
+
+# Item templates mapping (inventory image, trade window image)
+item_templates = {
+    "dino_egg": ("dino_egg_inventory.png", "dino_egg.png"),
+    "icecream_machine": ("icm_inventory.png", "icm.png"),
+    "majestic_chair": ("MJS_INVENTORY.png", "MJS.png"),
+    "petal_patch": ("petal_inventory.png", "petal.png"),
+    "purple_pillow": ("pillow_inventory.png", "Pillow.png"),
+    "hc_sofa": ("Sofa_inv.png", "Sofa.png"),
+    "cola_machine": ("Cola_inventory.png", "cola.png"),
+}
+
+# UI anchors searched for on screen
+button_templates = {
+    "accept_button": "accept_button.png",
+    "cancel_button": "cancel_button.png",
+    "my_item_box": "my_item_box.png",
+    "next_page_button": "next_page_button.png",
+    # The open Safe Trading window; the trade machine watches it to notice trades opening and closing
+    "safe_trading_window": "Final_before_agree.PNG",
+}
+
+# Resolve a path, falling back to a case-insensitive lookup (templates are named inconsistently)
+def resolve_path(path):
+    if os.path.exists(path):
+        return path
+    directory, name = os.path.split(path)
+    try:
+        for entry in os.listdir(directory or "."):
+            if entry.lower() == name.lower():
+                return os.path.join(directory, entry)
+    except FileNotFoundError:
+        pass
+    return None
+
+# Key used to serve templates by their original path
+def _path_key(path):
+    return os.path.normpath(path).replace("\\", "/").lower()
+
+# Read an image from disk as BGR (alpha dropped)
+def _read_color(path):
+    resolved = resolve_path(path)
+    if resolved is None:
+        return None
+    return cv2.imread(resolved, cv2.IMREAD_COLOR)
+
+# Holds every template decoded, grayscaled and pre-sized once
+class TemplateBank:
+    # shared: {path key: (color, gray)} of already decoded templates (see shared_templates), used instead of disk
+    def __init__(self, template_dir=template_dir, blank_image_path=blank_image_path, blank_shapes=blank_shapes,
+                 shared=None):
+        self.template_dir = template_dir
+        self.blank_image_path = blank_image_path
+        self.digits_me = {}
+        self.digits_other = {}
+        self.buttons = {}
+        self.buttons_color = {}
+        self.items_inventory = {}
+        self.items_inventory_color = {}
+        self.items_trade = {}
+        self.blank_gray = None
+        self.missing = []
+        self._blank_sized = {}
+        self._by_path = {}
+        self._shared = shared or {}
+        self._lock = threading.Lock()
+        self.load(blank_shapes)
+
+    # Load one template into the path index and return (color, gray)
+    def _add(self, path, required=True):
+        key = _path_key(path)
+        if key in self._shared:
+            color, gray = self._shared[key]
+            self._by_path[key] = (color, gray)
+            return color, gray
+        color = _read_color(path)
+        if color is None:
+            if required:
+                self.missing.append(path)
+            self._by_path[key] = None
+            return None, None
+        gray = cv2.cvtColor(color, cv2.COLOR_BGR2GRAY)
+        self._by_path[key] = (color, gray)
+        return color, gray
+
+    # Decoded templates as {path key: (color, gray)}, e.g. to publish them in shared memory
+    def entries(self):
+        with self._lock:
+            return {key: entry for key, entry in self._by_path.items() if entry is not None}
+
+    # Load all digit, blank, button and item templates
+    def load(self, blank_shapes=()):
+        for label in range(0, 10):  # Load templates for digits 0-9 (a slot never shows 0)
+            _, gray = self._add(os.path.join(self.template_dir, f'Me/{label}.png'), required=label > 0)
+            if gray is not None:
+                self.digits_me[f'Me_{label}'] = gray
+            _, gray = self._add(os.path.join(self.template_dir, f'Other/Other_{label}.png'), required=label > 0)
+            if gray is not None:
+                self.digits_other[f'Other_{label}'] = gray
+        _, empty = self._add(os.path.join(self.template_dir, 'Empty.png'), required=False)
+        if empty is not None:
+            self.digits_me['Empty'] = empty
+            self.digits_other['Empty'] = empty
+
+        _, self.blank_gray = self._add(self.blank_image_path)
+        for shape in blank_shapes:
+            self.blank(shape)
+
+        for name, filename in button_templates.items():
+            color, gray = self._add(os.path.join(self.template_dir, filename))
+            if gray is not None:
+                self.buttons_color[name] = color
+                self.buttons[name] = gray
+
+        for item, (inventory_image, trade_image) in item_templates.items():
+            color, gray = self._add(os.path.join(self.template_dir, 'Items', inventory_image))
+            if gray is not None:
+                self.items_inventory[item] = gray
+                self.items_inventory_color[item] = color
+            _, gray = self._add(os.path.join(self.template_dir, 'Items', trade_image))
+            if gray is not None:
+                self.items_trade[item] = gray
+
+    # Check the loaded set and log anything recognition will have to do without
+    def validate(self, slot_shape=(20, 21)):
+        problems = []
+        for path in self.missing:
+            problems.append(f"Missing template {path}")
+        if self.blank_gray is None:
+            problems.append(f"Blank reference {self.blank_image_path} could not be loaded")
+        for templates in (self.digits_me, self.digits_other):
+            for label, template in templates.items():
+                if template.shape[0] > slot_shape[0] or template.shape[1] > slot_shape[1]:
+                    problems.append(f"Template {label} {template.shape} is larger than the slot {slot_shape}")
+        if not self.digits_me or not self.digits_other:
+            problems.append("No digit templates loaded for one of the trade sides")
+        for problem in problems:
+            logging.error(problem)
+        return problems
+
+    # Blank reference resized to the given (height, width)
+    def blank(self, shape):
+        shape = tuple(shape[:2])
+        blank = self._blank_sized.get(shape)
+        if blank is None:
+            if self.blank_gray is None:
+                return None
+            blank = self.blank_gray
+            if blank.shape != shape:
+                blank = cv2.resize(blank, (shape[1], shape[0]))
+            with self._lock:
+                self._blank_sized[shape] = blank
+        return blank
+
+    # Serve a template by its file path, reading it only the first time it is asked for
+    def get(self, path, color=False):
+        key = _path_key(path)
+        if key not in self._by_path:
+            with self._lock:
+                if key not in self._by_path:
+                    color_image, _ = self._add(path)
+                    if color_image is None:
+                        logging.error(f"Failed to load {path}")
+                        self._by_path[key] = None
+        entry = self._by_path[key]
+        if entry is None:
+            return None
+        return entry[0] if color else entry[1]
+
+_bank = None
+_bank_lock = threading.Lock()
+
+# Shared bank, loaded and validated on first use. With TRADEBOT_TEMPLATE_SHM set (by the supervisor)
+# the templates are mapped from that shared memory block instead of being read from disk.
+def get_template_bank():
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                shared = None
+                shm_name = os.environ.get("TRADEBOT_TEMPLATE_SHM")
+                if shm_name:
+                    from shared_templates import attach_templates
+                    try:
+                        shared = attach_templates(shm_name, track=False)
+                    except Exception as e:
+                        logging.error(f"Failed to attach shared templates {shm_name}: {str(e)}")
+                bank = TemplateBank(shared=shared)
+                bank.validate()
+                _bank = bank
+    return _bank
+
+# Replace the shared bank (e.g. one backed by shared memory in a pool worker)
+def set_template_bank(bank):
+    global _bank
+    _bank = bank
+
+# Load templates for number recognition
+def load_templates():
+    bank = get_template_bank()
+    return bank.digits_me, bank.digits_other
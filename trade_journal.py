@@ -0,0 +1,279 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from log_setup import subsystem
+
+log = subsystem("trade")
+
+# Same instance name as the bot the journal belongs to (see TradeBot.instance_name)
+instance_name = os.environ.get("TRADEBOT_INSTANCE", "")
+instance_suffix = f"_{instance_name}" if instance_name else ""
+
+# Append-only record of every trade state transition, one JSON object per line
+journal_file = os.environ.get("TRADEBOT_JOURNAL") or f"trade_journal{instance_suffix}.jsonl"
+
+# Pending records are written and fsynced together at most this many seconds apart,
+# or as soon as this many are waiting (or one urgent record is)
+flush_interval = 1.0
+flush_batch = 32
+
+# Records appended since the last compaction before the journal is rewritten as a snapshot
+compact_after = 5000
+
+# Finished trades kept in the snapshot
+history_size = 100
+
+# Message advertised when the journal has none yet
+default_message = "Selling Dino for Cola"
+
+# States that end a trade
+final_states = ("done", "cancelled")
+
+# Summary the journal replays into: what the bot was doing, the trade in progress and totals
+def empty_summary():
+    return {
+        "message": default_message,
+        "state": None,
+        "trade": None,
+        "trades_completed": 0,
+        "trades_cancelled": 0,
+        "trades_interrupted": 0,
+        "history": [],
+        "updated": None,
+    }
+
+# Fold one record into a summary
+def apply_record(summary, record):
+    event = record.get("event")
+    ts = record.get("ts")
+    if event == "snapshot":
+        summary.clear()
+        summary.update(empty_summary())
+        summary.update(record["summary"])
+        return summary
+    summary["updated"] = ts
+    if event == "session":
+        summary["message"] = record.get("message", summary["message"])
+    elif event == "placed" and summary["trade"] is not None:
+        summary["trade"]["placed"] = record.get("placed", 0)
+    elif event == "state":
+        state = record.get("to")
+        trade = summary["trade"]
+        # A trade that never reached done or cancelled was cut short (crash, restart)
+        if trade is not None and state in ("advertising", "trade_open"):
+            _finish(summary, trade, "interrupted", ts, "bot restarted")
+            trade = None
+        if state == "trade_open":
+            trade = summary["trade"] = {"started": ts, "state": state, "placed": 0}
+        elif trade is not None:
+            trade["state"] = state
+            if state in final_states:
+                _finish(summary, trade, state, ts, record.get("info", {}).get("reason"))
+        summary["state"] = state
+    return summary
+
+def _finish(summary, trade, outcome, ts, reason=None):
+    key = {"done": "trades_completed", "cancelled": "trades_cancelled"}.get(outcome, "trades_interrupted")
+    summary[key] += 1
+    entry = {"started": trade["started"], "ended": ts, "outcome": outcome, "placed": trade.get("placed", 0)}
+    if reason:
+        entry["reason"] = reason
+    summary["history"] = (summary["history"] + [entry])[-history_size:]
+    summary["trade"] = None
+
+# Append-only trade journal. Records are queued in memory and a background thread appends them in
+# batches with one fsync per batch, so recording a transition never waits on the disk. Opening the
+# journal replays it (a snapshot line followed by later records) into a summary, so the bot resumes
+# with its message, totals and any trade that was still open when it stopped. Once compact_after
+# records have piled up the file is rewritten as a single snapshot (temp file and rename).
+class TradeJournal:
+    def __init__(self, path=journal_file, interval=flush_interval, batch=flush_batch, compact_every=compact_after):
+        self.path = path
+        self.interval = interval
+        self.batch = batch
+        self.compact_every = compact_every
+        self.summary = empty_summary()
+        self.seq = 0
+        self.records_since_compaction = 0
+        self.listeners = []
+        self._pending = []
+        self._urgent = False
+        self._file = None
+        self._thread = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self.load()
+
+    # Replay the journal from disk. A last line cut off by a crash is truncated away, so new records
+    # start on a line of their own; other damaged lines are skipped.
+    def load(self):
+        summary = empty_summary()
+        records = 0
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            log.warning("Dropping an unfinished record at the end of %s", self.path)
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                log.warning("Skipping damaged journal line in %s", self.path)
+                continue
+            apply_record(summary, record)
+            self.seq = max(self.seq, record.get("seq", 0))
+            records += 1
+        with self._condition:
+            self.summary = summary
+            self.records_since_compaction = records
+        return summary
+
+    # Call listener(record) from the recording thread for every new record
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    # Append a record; urgent=True has the writer thread write it right away instead of at the next
+    # interval, without waiting for the disk (use flush() to wait)
+    def record(self, event, urgent=False, **fields):
+        with self._condition:
+            if self._closed:
+                return None
+            self.seq += 1
+            record = {"ts": round(time.time(), 3), "seq": self.seq, "event": event}
+            record.update(fields)
+            apply_record(self.summary, record)
+            self._pending.append(record)
+            self._start()
+            if urgent:
+                self._urgent = True
+            if self._urgent or len(self._pending) >= self.batch:
+                self._condition.notify_all()
+        for listener in list(self.listeners):
+            try:
+                listener(record)
+            except Exception as e:
+                log.error(f"Journal listener failed: {str(e)}")
+        return record
+
+    # Listener for TradeMachine.subscribe; runs on the event loop, so the end of a trade is handed
+    # to the writer thread to sync right away rather than written here
+    def record_transition(self, old_state, new_state, info):
+        fields = {"from": old_state.value, "to": new_state.value,
+                  "info": {key: str(value) for key, value in info.items()}}
+        self.record("state", urgent=new_state.value in final_states, **fields)
+
+    # Copy of the replayed summary
+    def state(self):
+        with self._condition:
+            return json.loads(json.dumps(self.summary))
+
+    # Trade that was still open when the journal was last written, or None
+    def open_trade(self):
+        with self._condition:
+            trade = self.summary["trade"]
+            return dict(trade) if trade is not None else None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._urgent or len(self._pending) >= self.batch,
+                                         self.interval)
+                self._urgent = False
+                if self._closed and not self._pending:
+                    return
+            try:
+                self._write_pending()
+            except Exception as e:
+                logging.error(f"Failed to write trade journal: {str(e)}")
+                logging.error(traceback.format_exc())
+                time.sleep(self.interval)
+
+    def _write_pending(self):
+        with self._condition:
+            self._write_pending_locked()
+
+    # Append everything pending with one fsync, compacting afterwards when due (lock held)
+    def _write_pending_locked(self):
+        records, self._pending = self._pending, []
+        if not records:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(''.join(json.dumps(record) + '\n' for record in records))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except Exception:
+            # Keep the records for the next attempt
+            self._pending = records + self._pending
+            raise
+        self.records_since_compaction += len(records)
+        if self.records_since_compaction >= self.compact_every:
+            self._compact()
+
+    # Rewrite the journal as one snapshot of the summary (lock held, nothing pending)
+    def _compact(self):
+        tmp_file = self.path + '.tmp'
+        snapshot = {"ts": round(time.time(), 3), "seq": self.seq, "event": "snapshot", "summary": self.summary}
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(snapshot) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        os.replace(tmp_file, self.path)
+        self.records_since_compaction = 1
+        log.info("Compacted trade journal %s", self.path)
+
+    # Compact now
+    def compact(self):
+        with self._condition:
+            self._write_pending_locked()
+            self._compact()
+
+    # Block until every record so far is on disk
+    def flush(self):
+        self._write_pending()
+
+    # Write what is pending and stop the writer thread
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._write_pending()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+_journal = None
+_journal_lock = threading.Lock()
+
+# Shared journal of this bot instance
+def get_trade_journal():
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = TradeJournal()
+    return _journal
@@ -0,0 +1,297 @@
+import asyncio
+import importlib
+import threading
+import time
+import traceback
+from enum import Enum
+from random import uniform
+from item_counter import start_counter_thread
+from layout import get_layout
+from log_setup import subsystem
+from metrics import count, get_metrics
+from slot_reader import get_slot_reader
+from template_bank import get_template_bank, load_templates
+from trade_journal import get_trade_journal
+from waits import anchor_gone
+
+log = subsystem("trade")
+
+# Seconds between two checks of the trade window and trade slot counts
+capture_interval = 0.2
+
+# Consecutive frames without the trade window before an open trade counts as closed
+closed_frames = 3
+
+# Anchor whose presence means a trade window is open (images/Final_before_agree.PNG)
+trade_window_anchor = "safe_trading_window"
+
+# Seconds between adverts (a random value in this range)
+advert_interval = (5, 10)
+
+# Seconds to wait for the accept to go through, and for the window to close once confirmed
+accept_timeout = 60
+
+class TradeState(Enum):
+    ADVERTISING = "advertising"
+    TRADE_OPEN = "trade_open"
+    WAITING_OFFER = "waiting_offer"
+    LOADING = "loading"
+    CONFIRMING = "confirming"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+# States in which a trade window is open and the inactivity timeout applies
+trade_states = (TradeState.TRADE_OPEN, TradeState.WAITING_OFFER, TradeState.LOADING, TradeState.CONFIRMING)
+
+class TradeCancelled(Exception):
+    pass
+
+# One trading session: advertises, watches the screen and walks each trade through its states.
+# Capture, adverts and the inactivity timeout run as separate tasks, so a trade request is noticed
+# within one capture interval. Blocking input and recognition calls run in worker threads.
+class TradeMachine:
+    def __init__(self, item, item_count, want_item, want_item_count, stop_event, bot=None,
+                 activity_timeout=None, journal=None):
+        self.bot = bot if bot is not None else importlib.import_module('TradeBot')
+        self.journal = journal if journal is not None else get_trade_journal()
+        self.item = item
+        self.item_count = item_count
+        self.want_item = want_item
+        self.want_item_count = want_item_count
+        self.stop_event = stop_event
+        if activity_timeout is None:
+            activity_timeout = self.bot.activity_timeout.total_seconds()
+        self.activity_timeout = activity_timeout
+        self.message = f"SELL {item_count} {item.upper()} FOR {want_item_count} {want_item.upper()}"
+        self.state = TradeState.ADVERTISING
+        self.state_since = time.monotonic()
+        self.listeners = []
+        self.trade_open = False
+        # Whether the trade window was on the last captured frame (trade_open lags by closed_frames)
+        self.window_visible = False
+        self.counts = {}
+        # Counts in the other player's six offer slots on the last frame with the window open
+        self.their_slots = []
+        self.last_activity = time.monotonic()
+        self.cancel_reason = None
+        # Set to make a running load_items give up between items
+        self.abort_event = threading.Event()
+        self.subscribe(self.journal.record_transition)
+
+    # Call listener(old_state, new_state, info) on every transition
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def _set_state(self, state, **info):
+        old_state, now = self.state, time.monotonic()
+        get_metrics().observe(f"state:{old_state.value}", now - self.state_since)
+        self.state, self.state_since = state, now
+        if state in (TradeState.DONE, TradeState.CANCELLED):
+            count(f"trades_{state.value}")
+        log.info(f"Trade state {old_state.value} -> {state.value} {info if info else ''}")
+        print(f"Trade state: {state.value}")
+        for listener in list(self.listeners):
+            try:
+                listener(old_state, state, info)
+            except Exception as e:
+                log.error(f"Trade state listener failed: {str(e)}")
+        self._wake()
+
+    # Wake every task waiting for the next frame or state change
+    def _wake(self):
+        self._tick.set()
+        self._tick = asyncio.Event()
+
+    async def _next_tick(self, timeout=None):
+        tick = self._tick
+        try:
+            await asyncio.wait_for(tick.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    # Wait until predicate() holds, re-checking it on every captured frame. Returns False on timeout.
+    # Raises TradeCancelled when the bot stops, the trade is cancelled or (unless closing is expected) the window closes.
+    async def _wait_for(self, predicate, timeout=None, closing_ok=False, blocking=False):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.stop_event.is_set():
+                raise TradeCancelled("bot stopped")
+            if self.cancel_reason:
+                raise TradeCancelled(self.cancel_reason)
+            if not closing_ok and not self.trade_open:
+                raise TradeCancelled("trade window closed")
+            satisfied = await asyncio.to_thread(predicate) if blocking else predicate()
+            if satisfied:
+                return True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            await self._next_tick(remaining)
+
+    # Capture loop: trade window presence, trade slot counts, inactivity and stop requests
+    async def _watch_screen(self):
+        misses = 0
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            try:
+                visible, their_slots = await asyncio.to_thread(self._capture)
+            except Exception as e:
+                log.error(f"Trade window check failed: {str(e)}")
+                visible, their_slots = False, []
+            misses = 0 if visible else misses + 1
+            self.window_visible = visible
+            if visible and not self.trade_open:
+                self.trade_open = True
+                self.last_activity = time.monotonic()
+            elif misses >= closed_frames:
+                self.trade_open = False
+
+            _, counts = self.bot.count_channel.snapshot()
+            if counts != self.counts:
+                self.counts = counts
+                self.last_activity = time.monotonic()
+            # Items waiting in their offer slots count as activity, like changing counts
+            self.their_slots = their_slots
+            if any(their_slots):
+                self.last_activity = time.monotonic()
+
+            if self.state in trade_states and not self.cancel_reason and \
+                    time.monotonic() - self.last_activity > self.activity_timeout:
+                self.cancel_reason = "no activity"
+                self.abort_event.set()
+            self._wake()
+            await asyncio.sleep(max(capture_interval - (time.monotonic() - started), 0))
+        self.abort_event.set()
+        self._wake()
+
+    # Re-verify the layout anchors (recalibrating if the windows moved), check for the trade window and,
+    # while it is open, read the other player's offer slots: (window visible, their six slot counts)
+    def _capture(self):
+        get_layout().check()
+        if self.bot.locate_button(trade_window_anchor) is None:
+            return False, []
+        reader = get_slot_reader(*load_templates())
+        return True, reader.read(reader.capture())[:6]
+
+    # Post the advert every few seconds while nobody is trading
+    async def _advertise(self):
+        while not self.stop_event.is_set():
+            if self.state == TradeState.ADVERTISING and not self.trade_open:
+                async with self._input_lock:
+                    await asyncio.to_thread(self.bot.post_advert, self.message)
+                await self._next_advert(uniform(*advert_interval))
+            else:
+                await self._next_tick()
+
+    async def _next_advert(self, delay):
+        deadline = time.monotonic() + delay
+        while self.state == TradeState.ADVERTISING and not self.stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            await self._next_tick(remaining)
+
+    async def _click(self, name):
+        async with self._input_lock:
+            return await asyncio.to_thread(self.bot.click_button, name)
+
+    # Walk one open trade from TradeOpen to Done; raises TradeCancelled otherwise
+    async def _trade(self):
+        self._set_state(TradeState.TRADE_OPEN)
+        count('trades_opened')
+
+        self._set_state(TradeState.WAITING_OFFER)
+        await self._wait_for(lambda: not self.bot.offer_slot_blank(), blocking=True)
+        await self._wait_for(lambda: self.counts.get("their_item_count", 0) >= self.want_item_count)
+        if not await asyncio.to_thread(self.bot.find_their_item, self.want_item):
+            raise TradeCancelled(f"offered item is not {self.want_item}")
+
+        self._set_state(TradeState.LOADING)
+        # Items already in the trade (e.g. placed before a restart) are not loaded again
+        already = self.counts.get("your_item_count", 0)
+        if already < self.item_count:
+            async with self._input_lock:
+                loaded = await asyncio.to_thread(self.bot.load_items, self.item, self.item_count - already,
+                                                 self.abort_event,
+                                                 lambda placed: self.journal.record("placed", placed=already + placed))
+            if not loaded:
+                raise TradeCancelled(self.cancel_reason or f"could not place {self.item_count} {self.item}")
+        await self._wait_for(lambda: self.counts.get("your_item_count", 0) >= self.item_count)
+
+        self._set_state(TradeState.CONFIRMING)
+        if not await self._click('accept_button'):
+            raise TradeCancelled("accept button not found")
+        # The trade goes through when the Safe Trading window closes; until then their offer may still drop.
+        # Counts read after the window vanished are not trusted, they come from an empty screen.
+        window_closed = anchor_gone(lambda: self.bot.locate_button(trade_window_anchor), closed_frames)
+        if not await self._wait_for(lambda: self._confirmed(window_closed), timeout=accept_timeout,
+                                    closing_ok=True, blocking=True):
+            raise TradeCancelled("trade window stayed open after accepting")
+        self._set_state(TradeState.DONE)
+
+    # Whether the accepted trade went through; raises TradeCancelled when their offer drops first
+    def _confirmed(self, window_closed):
+        if self.window_visible and self.counts.get("their_item_count", 0) < self.want_item_count:
+            raise TradeCancelled("their offer was reduced")
+        return window_closed()
+
+    # Main flow: advertise, handle each trade, repeat until stopped
+    async def _run_trades(self):
+        while not self.stop_event.is_set():
+            self.cancel_reason = None
+            self.abort_event.clear()
+            if self.state != TradeState.ADVERTISING:
+                self._set_state(TradeState.ADVERTISING)
+            await self._wait_idle_until(lambda: self.trade_open)
+            if self.stop_event.is_set():
+                break
+            try:
+                await self._trade()
+            except TradeCancelled as e:
+                self._set_state(TradeState.CANCELLED, reason=str(e))
+                if self.trade_open:
+                    await self._click('cancel_button')
+            except Exception as e:
+                log.error(f"Trade failed: {str(e)}")
+                log.error(traceback.format_exc())
+                self._set_state(TradeState.CANCELLED, reason=str(e))
+                if self.trade_open:
+                    await self._click('cancel_button')
+            # Do not advertise into a window that is still closing
+            await self._wait_idle_until(lambda: not self.trade_open, timeout=accept_timeout)
+
+    async def _wait_idle_until(self, predicate, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.stop_event.is_set() and not predicate():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return
+            await self._next_tick(remaining)
+
+    async def run(self):
+        # Without the window template no trade would ever be noticed; refuse to advertise at all
+        if get_template_bank().buttons_color.get(trade_window_anchor) is None:
+            raise RuntimeError(f"No template loaded for the trade window anchor {trade_window_anchor}")
+        interrupted = self.journal.open_trade()
+        if interrupted is not None:
+            log.warning(f"Previous run stopped during a trade ({interrupted['state']}, "
+                        f"{interrupted['placed']} placed); resuming from the screen")
+        self.journal.record("session", message=self.message, item=self.item, item_count=self.item_count,
+                            want_item=self.want_item, want_item_count=self.want_item_count)
+        self._tick = asyncio.Event()
+        self._input_lock = asyncio.Lock()
+        start_counter_thread(self.bot.count_channel, self.stop_event)
+        tasks = [asyncio.create_task(self._watch_screen(), name="watch-screen"),
+                 asyncio.create_task(self._advertise(), name="advertise")]
+        try:
+            await self._run_trades()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+# Run a trading session until stop_event is set (blocks the calling thread)
+def run_trade_machine(item, item_count, want_item, want_item_count, stop_event, bot=None):
+    machine = TradeMachine(item, item_count, want_item, want_item_count, stop_event, bot)
+    asyncio.run(machine.run())
+    return machine
@@ -0,0 +1,120 @@
+import os
+import time
+from log_setup import subsystem
+from metrics import count, get_metrics
+from waits import pause
+
+log = subsystem("trade")
+
+# Pause between the input events of one item (move, pick up, move, drop), plus up to the jitter on top
+transfer_delay = float(os.environ.get("TRADEBOT_TRANSFER_DELAY", 0.05))
+transfer_jitter = 0.03
+
+# Items dragged before the trade slot counter is asked whether they arrived
+batch_size = int(os.environ.get("TRADEBOT_TRANSFER_BATCH", 5))
+
+# Seconds the counter may take to show a batch
+verify_timeout = 2
+
+# Batches in a row that may show no progress before the transfer gives up
+max_stalls = 2
+
+# One batch of drags: inventory positions and the point they are dropped on
+class TransferPlan:
+    def __init__(self, item, positions, drop_target):
+        self.item = item
+        self.positions = list(positions)
+        self.drop_target = drop_target
+
+    def __len__(self):
+        return len(self.positions)
+
+# Moves items from the inventory into the trade window. Positions come from the inventory index
+# (one scan per page instead of one per item), the drop target is resolved once per transfer, and the
+# drags of a batch are issued back to back with only transfer_delay between input events. Progress is
+# verified through the trade slot counter (CountChannel) after each batch instead of watching the
+# screen after every item; a batch that did not fully arrive is re-planned from a fresh page scan.
+class ItemTransfer:
+    def __init__(self, channel, index, locate_drop, delay=transfer_delay, jitter=transfer_jitter,
+                 batch=batch_size, timeout=verify_timeout):
+        self.channel = channel
+        self.index = index
+        self.locate_drop = locate_drop
+        self.delay = delay
+        self.jitter = jitter
+        self.batch = max(1, batch)
+        self.timeout = timeout
+
+    # Plan the next batch of up to amount items, or None when the item or drop target cannot be found
+    def plan(self, item, amount, drop_target=None):
+        positions = self.index.find(item)
+        if not positions:
+            log.warning("No %s left in the inventory", item)
+            return None
+        if drop_target is None:
+            drop_target = self.locate_drop()
+            if drop_target is None:
+                log.warning("Trade drop target not found")
+                return None
+        return TransferPlan(item, positions[:min(amount, self.batch)], drop_target)
+
+    # Issue the drags of one plan; returns how many were issued before abort_event was set
+    def execute(self, plan, abort_event=None):
+        import pyautogui
+        issued = 0
+        for position in plan.positions:
+            if abort_event is not None and abort_event.is_set():
+                break
+            pyautogui.moveTo(position)
+            pause('transfer_move', self.delay, self.jitter)
+            pyautogui.click(position)
+            pause('transfer_pick', self.delay, self.jitter)
+            pyautogui.moveTo(plan.drop_target)
+            pause('transfer_drop_move', self.delay, self.jitter)
+            pyautogui.click()
+            issued += 1
+        self.index.remove(plan.item, plan.positions[:issued])
+        return issued
+
+    # Wait until the counter shows at least target items; returns the count it shows
+    def verify(self, target):
+        start = time.perf_counter()
+        self.channel.wait_at_least("your_item_count", target, timeout=self.timeout)
+        get_metrics().observe('transfer_verify', time.perf_counter() - start)
+        return self.channel.get("your_item_count")
+
+    # Place amount of item in the trade window; returns whether all of them arrived.
+    # progress(placed) is called whenever the counter shows more of them.
+    def run(self, item, amount, abort_event=None, progress=None):
+        start_count = self.channel.get("your_item_count")
+        target = start_count + amount
+        placed = 0
+        stalls = 0
+        drop_target = None
+        while placed < amount:
+            if abort_event is not None and abort_event.is_set():
+                return False
+            plan = self.plan(item, amount - placed, drop_target)
+            if plan is None:
+                return False
+            drop_target = plan.drop_target
+            start = time.perf_counter()
+            issued = self.execute(plan, abort_event)
+            shown = self.verify(min(target, start_count + placed + issued))
+            get_metrics().observe('transfer_batch', time.perf_counter() - start)
+            arrived = shown - start_count - placed
+            count('items_transferred', max(arrived, 0))
+            log.debug("Transferred %d of %d %s (%d issued)", shown - start_count, amount, item, issued)
+            if arrived <= 0:
+                stalls += 1
+                if stalls > max_stalls:
+                    log.warning("Trade slot count stuck at %d while loading %s", shown, item)
+                    return False
+                # The drop target may have moved; resolve it again for the next batch
+                drop_target = None
+            else:
+                stalls = 0
+                if progress is not None:
+                    progress(min(shown - start_count, amount))
+            placed = max(placed, shown - start_count)
+        return True
@@ -0,0 +1,59 @@
+import logging
+import time
+from random import uniform
+from inventory_index import page_signature
+from log_setup import subsystem
+from metrics import count, get_metrics
+from screen_source import get_screen_source
+
+log = subsystem("waits")
+
+# Seconds between two checks of a wait condition
+wait_interval = 0.05
+
+# Poll predicate until it holds or timeout passes. Always waits at least min_wait plus up to jitter
+# seconds, so clicks keep a human-looking floor. Returns whether the condition held.
+def wait_until(predicate, timeout, step="wait", interval=wait_interval, min_wait=0, jitter=0, stop_event=None):
+    start = time.perf_counter()
+    floor = min_wait + (uniform(0, jitter) if jitter else 0)
+    deadline = start + max(timeout, floor)
+    satisfied = False
+    while True:
+        now = time.perf_counter()
+        if now - start >= floor:
+            try:
+                satisfied = bool(predicate())
+            except Exception as e:
+                logging.error(f"Wait condition for {step} failed: {str(e)}")
+                satisfied = False
+            if satisfied:
+                break
+        if now >= deadline or (stop_event is not None and stop_event.is_set()):
+            break
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(min(interval, remaining))
+    elapsed = time.perf_counter() - start
+    get_metrics().observe(f"wait:{step}", elapsed)
+    if not satisfied:
+        count(f"wait_timeout:{step}")
+    log.info("Waited %.2fs for %s (%s)", elapsed, step, 'done' if satisfied else 'timed out')
+    return satisfied
+
+# Fixed pause of min_wait plus up to jitter seconds, recorded like any other wait
+def pause(step, min_wait, jitter=0):
+    return wait_until(lambda: True, 0, step=step, min_wait=min_wait, jitter=jitter)
+
+# Condition: the pixels of a screen region differ from when the condition was created
+def region_changed(region, source=None):
+    source = source if source is not None else get_screen_source()
+    baseline = page_signature(source.grab(region, gray=True))
+    return lambda: page_signature(source.grab(region, gray=True)) != baseline
+
+# Condition: locate() found nothing frames checks in a row (a window that closed)
+def anchor_gone(locate, frames=3):
+    misses = [0]
+    def gone():
+        misses[0] = misses[0] + 1 if locate() is None else 0
+        return misses[0] >= frames
+    return gone